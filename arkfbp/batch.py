@@ -0,0 +1,212 @@
+"""
+Batch runs of one flow over many inputs, see `Executer.start_flows`.
+
+Inputs are walked through the plan together: at every step the items standing on the same node run together,
+and a node class defining `run_batch(self, inputs_list, *args, **kwargs)` receives all of their inputs at once.
+Every item is a run of its own as for `Executer.start_flow`: its deadline, metrics and the end of the run.
+The flows of a batch interleave in one thread, their cpu time is not measured.
+"""
+import time
+from collections import namedtuple, OrderedDict
+from inspect import iscoroutinefunction
+from itertools import islice
+
+from . import checkpoint as flow_checkpoint
+from . import deadline as flow_deadline
+from . import metrics
+from .executer import Executer
+
+# result of one item of `Executer.start_flows`
+FlowResult = namedtuple('FlowResult', ['inputs', 'status', 'outputs', 'error'])
+
+# number of inputs walked through the graph together by `Executer.start_flows`
+DEFAULT_BATCH_SIZE = 500
+
+
+def start_flows(flow_cls, inputs_iterable, *args, batch_size=DEFAULT_BATCH_SIZE, lazy=False, run_timeout=None,
+                run_deadline=None, **kwargs):
+    """
+    Start the same flow for every inputs of an iterable, returns a list of `FlowResult`,
+    or a generator of them when `lazy` is True.
+    every run is bounded by `run_timeout` from the start of its batch, or by `run_deadline`, see `arkfbp.deadline`.
+    """
+    template = flow_cls()
+    template.debug = False
+
+    def iterate():
+        iterator = iter(inputs_iterable)
+        batch = list(islice(iterator, batch_size))
+        while batch:
+            yield from start_batch(template, batch, *args, run_timeout=run_timeout, run_deadline=run_deadline,
+                                   **kwargs)
+            batch = list(islice(iterator, batch_size))
+
+    return iterate() if lazy else list(iterate())
+
+
+def start_batch(template, batch, *args, run_timeout=None, run_deadline=None, **kwargs):
+    """
+    run a batch of inputs through the flow, see `start_flows`.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .flow import Flow
+    flows = [template.clone() for _ in batch]
+    # a flow overriding `main` does not walk its plan, it runs one by one
+    if template.__class__.main is not Flow.main:
+        if iscoroutinefunction(template.main):
+            raise Exception(f'{template} is an async flow, start it by start_flow_async')
+        for flow, inputs in zip(flows, batch):
+            Executer.start_flow(flow, inputs, *args, run_timeout=run_timeout, run_deadline=run_deadline, **kwargs)
+            yield FlowResult(inputs, flow.status, flow.outputs, flow.error)
+        return
+
+    starts = [metrics.start(cpu=False) if metrics.enabled(flow) else None for flow in flows]
+    positions = {}
+    observers = {}
+    for index, (flow, inputs) in enumerate(zip(flows, batch)):
+        flow_deadline.bound(flow, run_timeout, run_deadline)
+        entry = _begin(flow, template.plan, inputs, *args, **kwargs)
+        if entry is not None:
+            observers[index] = flow.plan_observers()
+            positions[index] = entry
+
+    _walk(flows, positions, observers, *args, **kwargs)
+
+    for index, (flow, inputs) in enumerate(zip(flows, batch)):
+        _end(flow, inputs, starts[index], *args, **kwargs)
+        yield FlowResult(inputs, flow.status, flow.outputs, flow.error)
+
+
+def _fail(flow, exception):
+    """
+    a node of the flow raised, `DeadlineExceeded` ends it as its deadline expiring, as in `Flow.main`.
+    """
+    if isinstance(exception, flow_deadline.DeadlineExceeded):
+        flow.on_deadline_exceeded()
+    else:
+        flow.terminate(exception)
+
+
+def _walk(flows, positions, observers, *args, **kwargs):
+    """
+    walk the flows from their plan node in positions {index: plan node} until every one of them ends.
+    """
+    while positions:
+        groups = OrderedDict()
+        for index, plan_node in positions.items():
+            groups.setdefault(plan_node, []).append(index)
+
+        for plan_node, indexes in groups.items():
+            _run_group(plan_node, [flows[index] for index in indexes], [observers[index] for index in indexes],
+                       *args, **kwargs)
+            for index in indexes:
+                flow = flows[index]
+                successor = plan_node.successor(flow.outputs) if flow.valid_status() else None
+                if successor is None:
+                    del positions[index]
+                else:
+                    positions[index] = successor
+
+
+def _begin(flow, plan, inputs, *args, **kwargs):
+    """
+    run the hooks before `main` of a flow, returns the plan node it starts from, None when it does not walk the plan.
+    """
+    flow.request = inputs
+    for hook in flow.before_main_hooks:
+        if not flow.valid_status():
+            break
+        getattr(flow, hook)(inputs, *args, **kwargs)
+    if not flow.valid_status():
+        return None
+    flow.begin(inputs)
+    return flow.plan_entry(plan)
+
+
+def _run_group(plan_node, flows, observers, *args, **kwargs):
+    """
+    run a plan node for the flows standing on it, with the observers of every flow called around it.
+    """
+    # the observers can stop the flow before the node
+    tokens = [[observer.before_node(flow, plan_node) for observer in flow_observers]
+              for flow, flow_observers in zip(flows, observers)]
+    running = [index for index, flow in enumerate(flows) if flow.valid_status()]
+
+    if hasattr(plan_node.cls, 'run_batch'):
+        _start_batch_node(plan_node, [flows[index] for index in running], *args, **kwargs)
+    else:
+        for index in running:
+            flow = flows[index]
+            # flows started by the node inherit the deadline of its flow
+            token = flow_deadline.activate(flow.deadline)
+            try:
+                Executer.start_node(plan_node.acquire(flow), flow, *args, graph_node=plan_node, **kwargs)
+            # pylint:disable=broad-except
+            except Exception as exception:
+                _fail(flow, exception)
+            finally:
+                flow_deadline.leave(token)
+
+    for index in running:
+        for observer, token in zip(observers[index], tokens[index]):
+            observer.after_node(flows[index], plan_node, flows[index].outputs, token)
+
+
+def _end(flow, inputs, started, *args, **kwargs):
+    """
+    run the hooks after `main` of a flow and end its run, as `Executer.start_flow` does.
+    """
+    try:
+        for hook in flow.after_main_hooks:
+            if not flow.valid_status():
+                break
+            getattr(flow, hook)(inputs, flow.outputs, *args, **kwargs)
+        if flow.checkpoint_every:
+            flow_checkpoint.finish(flow)
+        if flow.valid_status():
+            flow.die()
+    finally:
+        # the outputs are returned in the result, a proxied response in them stays open
+        Executer.end_run(flow, started, flow.outputs)
+
+
+def _start_batch_node(plan_node, flows, *args, **kwargs):
+    """
+    run a batch aware node once for all the flows standing on it.
+    the state of every flow records a node of its own, with its inputs and outputs.
+    """
+    if not flows:
+        return
+    started = time.perf_counter()
+    node = plan_node.cls()
+    node.id = plan_node.id
+    node.flows = flows
+    node.inputs = [flow.outputs for flow in flows]
+    # the call is bounded by the earliest deadline of its flows
+    deadlines = [flow.deadline for flow in flows if flow.deadline is not None]
+    token = flow_deadline.activate(min(deadlines) if deadlines else None)
+    try:
+        outputs_list = list(node.run_batch(node.inputs, *args, **kwargs))
+        if len(outputs_list) != len(flows):
+            raise Exception(f'Node ID:{node.id} run_batch returned {len(outputs_list)} outputs '
+                            f'for {len(flows)} inputs')
+    # pylint:disable=broad-except
+    except Exception as exception:
+        for flow in flows:
+            _fail(flow, exception)
+        return
+    finally:
+        flow_deadline.leave(token)
+
+    node.outputs = outputs_list
+    duration = time.perf_counter() - started
+    for flow, inputs, outputs in zip(flows, node.inputs, outputs_list):
+        if flow.valid_status():
+            step = plan_node.cls.__new__(plan_node.cls)
+            step.id = plan_node.id
+            step.flow = flow
+            step.state = flow.state
+            step.inputs = inputs
+            step.outputs = outputs
+            flow.outputs = outputs
+            flow.state.push(step, duration=duration)
@@ -0,0 +1,10 @@
+"""
+Benchmarks of the arkfbp engine.
+
+    python -m arkfbp.benchmarks run --output baseline.json
+    python -m arkfbp.benchmarks run --output current.json
+    python -m arkfbp.benchmarks compare baseline.json current.json
+
+Outside a django project the benchmarks configure django with an in-memory SQLite database.
+"""
+from .runner import BENCHMARKS, benchmark, compare, run, setup_django
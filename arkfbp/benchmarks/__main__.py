@@ -0,0 +1,50 @@
+"""
+python -m arkfbp.benchmarks run|compare
+"""
+import argparse
+import json
+import sys
+
+from .runner import compare, run
+
+
+def main(argv=None):
+    """
+    command line of the benchmarks.
+    """
+    parser = argparse.ArgumentParser(prog='python -m arkfbp.benchmarks', description='Benchmarks of arkfbp.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks and write the results as JSON.')
+    run_parser.add_argument('--output', type=str, help='File of the results, stdout by default.')
+    run_parser.add_argument('--filter', type=str, nargs='*', help='Only run the benchmarks whose name contains it.')
+    run_parser.add_argument('--repeat', type=int, default=5, help='Times every benchmark is measured.')
+    run_parser.add_argument('--number', type=int, help='Calls per measure, about 0.2 seconds by default.')
+
+    compare_parser = commands.add_parser('compare', help='Compare results against a baseline.')
+    compare_parser.add_argument('baseline', type=str, help='JSON results of the baseline.')
+    compare_parser.add_argument('current', type=str, help='JSON results to compare.')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Slowdown reported as a regression.')
+    compare_parser.add_argument('--stat', type=str, default='median', choices=['min', 'median', 'mean'])
+
+    options = parser.parse_args(argv)
+    if options.command == 'run':
+        results = run(options.filter, options.repeat, options.number, log=lambda line: print(line, file=sys.stderr))
+        if options.output:
+            with open(options.output, 'w', encoding='utf8') as output:
+                json.dump(results, output, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+        return 0
+
+    with open(options.baseline, encoding='utf8') as baseline, open(options.current, encoding='utf8') as current:
+        rows = compare(json.load(baseline), json.load(current), options.threshold, options.stat)
+    for row in rows:
+        flag = ' REGRESSION' if row['regression'] else ''
+        print(f'{row["name"]:45} {row["baseline"] * 1e6:12.1f} us {row["current"] * 1e6:12.1f} us '
+              f'{row["ratio"]:7.2f}x{flag}')
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
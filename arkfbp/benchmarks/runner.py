@@ -0,0 +1,115 @@
+"""
+Registry, timing and comparison of the benchmarks.
+"""
+import platform
+import statistics
+import time
+import timeit
+
+import django
+from django.conf import settings
+
+import arkfbp
+
+# {name: function(param) returning the callable timed}
+BENCHMARKS = {}
+
+
+def benchmark(name, params=(None, )):
+    """
+    register a benchmark, the function does the setup for a param and returns the callable timed.
+    """
+    def decorator(func):
+        for param in params:
+            BENCHMARKS[name if param is None else f'{name}[{param}]'] = (func, param)
+        return func
+
+    return decorator
+
+
+def setup_django():
+    """
+    configure django with an in-memory SQLite database when no project is configured.
+    """
+    if not settings.configured:
+        settings.configure(
+            DEBUG=False,
+            USE_TZ=True,
+            SECRET_KEY='arkfbp-benchmarks',
+            ALLOWED_HOSTS=['*'],
+            DATABASES={'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:'
+            }},
+            INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth'],
+        )
+    django.setup()
+    # pylint: disable=import-outside-toplevel
+    from django.core.management import call_command
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+def measure(func, repeat, number):
+    """
+    seconds per call of `number` calls, `repeat` times.
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        # about 0.2 seconds per repeat
+        number, _ = timer.autorange()
+    times = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def run(names=None, repeat=5, number=None, log=None):
+    """
+    run the benchmarks whose name contains one of the names, all of them by default.
+    """
+    setup_django()
+    # pylint: disable=import-outside-toplevel, unused-import
+    from . import suites
+    results = {}
+    for name, (func, param) in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = measure(func(param), repeat, number)
+        if log:
+            log(f'{name}: {results[name]["median"] * 1e6:.1f} us')
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'arkfbp': arkfbp.__version__,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'benchmarks': results,
+    }
+
+
+def compare(baseline, current, threshold=0.1, stat='median'):
+    """
+    ratio current / baseline of the benchmarks in both results,
+    a benchmark slower than the baseline by more than the threshold is a regression.
+    """
+    rows = []
+    for name, result in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        ratio = result[stat] / base[stat] if base[stat] else float('inf')
+        rows.append({
+            'name': name,
+            'baseline': base[stat],
+            'current': result[stat],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    return rows
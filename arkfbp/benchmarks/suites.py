@@ -0,0 +1,169 @@
+"""
+The benchmarks, each function does its setup and returns the callable timed.
+"""
+import json
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+
+from arkfbp.common.django.middleware.request import _extract
+from arkfbp.executer import Executer
+from arkfbp.flow import Flow
+from arkfbp.node import (FunctionNode, IFNode, StartNode, StopNode, SerializerNode, ListSerializerNode, CharFieldNode,
+                         IntegerFieldNode, PaginationNode)
+from .runner import benchmark
+
+
+class _Start(StartNode):
+    pass
+
+
+class _Stop(StopNode):
+
+    def run(self, *args, **kwargs):
+        return self.inputs
+
+
+class _Increment(FunctionNode):
+
+    def run(self, *args, **kwargs):
+        return self.inputs + 1
+
+
+class _Positive(IFNode):
+
+    def positive_statement(self):
+        return True
+
+
+class _Flow(Flow):
+    """
+    a flow of the graph nodes given to `make_flow`.
+    """
+    debug = False
+    graph_nodes = []
+
+    def create_nodes(self):
+        return self.graph_nodes
+
+
+def make_flow(graph_nodes):
+    """
+    a flow class of the graph nodes.
+    """
+    return type('BenchmarkFlow', (_Flow, ), {'graph_nodes': graph_nodes})
+
+
+class _UserRow(SerializerNode):
+    id = IntegerFieldNode()
+    username = CharFieldNode()
+    email = CharFieldNode()
+
+
+class _UserItem(SerializerNode):
+    item = _UserRow()
+
+
+def create_users(count):
+    """
+    the queryset of `count` users in the in-memory database.
+    """
+    User.objects.all().delete()
+    User.objects.bulk_create(
+        [User(username=f'user{index}', email=f'user{index}@example.com') for index in range(count)])
+    return User.objects.order_by('id')
+
+
+@benchmark('start_flow', params=(5, 20, 100))
+def start_flow(size):
+    """
+    a straight flow of `size` function nodes.
+    """
+    ids = [f'node{index}' for index in range(size)]
+    graph_nodes = [{'cls': _Start, 'id': 'start', 'next': ids[0]}]
+    graph_nodes += [{'cls': _Increment, 'id': node_id, 'next': next_id} for node_id, next_id in zip(ids, ids[1:])]
+    graph_nodes += [{'cls': _Increment, 'id': ids[-1], 'next': 'stop'}, {'cls': _Stop, 'id': 'stop'}]
+    flow_cls = make_flow(graph_nodes)
+    return lambda: Executer.start_flow(flow_cls(), 0)
+
+
+@benchmark('if_node', params=(5, 20, 100))
+def if_node(size):
+    """
+    a flow of `size` IF nodes, each one branches to the next.
+    """
+    ids = [f'if{index}' for index in range(size)] + ['stop']
+    graph_nodes = [{'cls': _Start, 'id': 'start', 'next': ids[0]}]
+    graph_nodes += [{
+        'cls': _Positive,
+        'id': node_id,
+        'positive_next': next_id,
+        'negative_next': 'stop'
+    } for node_id, next_id in zip(ids, ids[1:])]
+    graph_nodes.append({'cls': _Stop, 'id': 'stop'})
+    flow_cls = make_flow(graph_nodes)
+    return lambda: Executer.start_flow(flow_cls(), 0)
+
+
+@benchmark('serializer_run', params=(5, 20, 50))
+def serializer_run(size):
+    """
+    validation of `size` char fields by a serializer node.
+    """
+    fields = {f'field{index}': CharFieldNode(max_length=32) for index in range(size)}
+    serializer_cls = type('BenchmarkSerializer', (SerializerNode, ), fields)
+    inputs = {f'field{index}': f'value{index}' for index in range(size)}
+    flow = make_flow([{'cls': _Start, 'id': 'start'}])()
+
+    def run():
+        return Executer.start_node(serializer_cls(), flow, inputs=inputs)
+
+    return run
+
+
+@benchmark('list_to_representation', params=(100, 1000))
+def list_to_representation(rows):
+    """
+    representation of `rows` users read from SQLite.
+    """
+    queryset = create_users(rows)
+    serializer = ListSerializerNode(child=_UserItem())
+    return lambda: serializer.to_representation(queryset.all())
+
+
+@benchmark('inputs_middleware', params=('query', 'json', 'form'))
+def inputs_middleware(body):
+    """
+    merge of the query and the body of a request into `request.ds`.
+    """
+    factory = RequestFactory()
+    data = {f'key{index}': f'value{index}' for index in range(20)}
+    if body == 'query':
+        request = factory.get('/', data)
+    elif body == 'json':
+        request = factory.post('/?page=1', json.dumps(data), content_type='application/json')
+    else:
+        request = factory.post('/?page=1', data)
+    # the body and the query are read once by the request, only the merge is measured
+    _extract(request)
+    return lambda: _extract(request)
+
+
+@benchmark('pagination', params=(100, 1000))
+def pagination(rows):
+    """
+    a page of 20 users out of `rows`, with their representation.
+    """
+    queryset = create_users(rows)
+    flow = make_flow([{'cls': _Start, 'id': 'start'}])()
+    serializer = ListSerializerNode(child=_UserItem())
+
+    def run():
+        return Executer.start_node(PaginationNode(),
+                                   flow,
+                                   inputs=queryset.all(),
+                                   serializer_node=serializer,
+                                   page=2,
+                                   page_size=20)
+
+    return run
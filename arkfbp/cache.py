@@ -0,0 +1,295 @@
+"""
+Memoized node results.
+
+A node class opts in by a cache policy, the executer returns the cached outputs
+instead of calling `run` when the key of the node is found:
+
+    class Config(FunctionNode):
+        cache_policy = CachePolicy(ttl=300, maxsize=256)
+
+        def cache_key(self):
+            return self.inputs['tenant']
+
+The outputs are shared by the runs hitting the cache, nodes must not modify them.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+from collections.abc import Iterator
+
+from cachetools import LRUCache, TTLCache
+
+BACKEND_LOCAL = 'local'
+BACKEND_DJANGO = 'django'
+BACKENDS = (BACKEND_LOCAL, BACKEND_DJANGO)
+
+# returned by `lookup` on a miss, outputs of a node can be None
+MISSING = object()
+
+
+class LocalCache:
+    """
+    In-process LRU cache, with an optional time to live.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self._cache = TTLCache(maxsize, ttl) if ttl else LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        cached value of the key.
+        """
+        with self._lock:
+            return self._cache.get(key, default)
+
+    def set(self, key, value):
+        """
+        cache the value of the key.
+        """
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        """
+        remove all the cached values.
+        """
+        with self._lock:
+            self._cache.clear()
+
+
+class DjangoCache:
+    """
+    Cache of the django cache framework, by the alias of `settings.CACHES`.
+
+    Every key holds the generation of the cache name, `clear` starts a new generation
+    so all the values cached before are ignored and left to expire.
+    """
+    prefix = 'arkfbp:node:'
+
+    def __init__(self, alias='default', ttl=None, name=''):
+        self.alias = alias
+        self.ttl = ttl
+        self.name = name
+
+    @property
+    def cache(self):
+        """
+        the django cache.
+        """
+        from django.core.cache import caches    # pylint: disable=import-outside-toplevel
+        return caches[self.alias]
+
+    @property
+    def generation_key(self):
+        """
+        django cache key of the generation.
+        """
+        return f'{self.prefix}{self.name}:generation'
+
+    def make_key(self, key):
+        """
+        django cache key of the key.
+        """
+        generation = self.cache.get(self.generation_key, 0)
+        return f'{self.prefix}{self.name}:{generation}:{hashlib.sha1(repr(key).encode()).hexdigest()}'
+
+    def get(self, key, default=None):
+        """
+        cached value of the key.
+        """
+        return self.cache.get(self.make_key(key), default)
+
+    def set(self, key, value):
+        """
+        cache the value of the key.
+        """
+        self.cache.set(self.make_key(key), value, self.ttl)
+
+    def clear(self):
+        """
+        start a new generation, the values cached before are left to expire.
+        """
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self.cache.set(self.generation_key, 1, None)
+
+
+class CachePolicy:
+    """
+    How the outputs of a node class are cached.
+
+    key: function of the node returning the cache key, `node.cache_key()` by default,
+         a None key skips the cache.
+    ttl: seconds the outputs are kept, None keeps them until evicted.
+    maxsize: number of outputs kept by the local backend.
+    backend: `local` for an in-process LRU, `django` for the django cache `alias`.
+    """
+
+    def __init__(self, key=None, ttl=60, maxsize=1024, backend=BACKEND_LOCAL, alias='default'):
+        if backend not in BACKENDS:
+            raise Exception(f'Unknown cache backend,Please choose one in {BACKENDS}')
+        self.key = key
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.backend = backend
+        self.alias = alias
+        self.name = ''
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        # the django backend of the policy is named by the node class it is declared in
+        if not self.name:
+            self.name = f'{owner.__module__}.{owner.__qualname__}'
+
+    @property
+    def cache(self):
+        """
+        the backend, created on first use.
+        """
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    if self.backend == BACKEND_DJANGO:
+                        self._cache = DjangoCache(self.alias, self.ttl, self.name)
+                    else:
+                        self._cache = LocalCache(self.maxsize, self.ttl)
+        return self._cache
+
+    def make_key(self, node):
+        """
+        cache key of the node, None skips the cache.
+        """
+        key = self.key(node) if self.key else node.cache_key()
+        if key is None:
+            return None
+        return f'{node.__class__.__module__}.{node.__class__.__qualname__}', key
+
+    def clear(self):
+        """
+        remove the cached outputs.
+        """
+        self.cache.clear()
+
+
+class CacheStats:
+    """
+    Hit and miss counters by node class.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: [0, 0])
+
+    def record(self, name, hit):
+        """
+        count a lookup.
+        """
+        with self._lock:
+            self._counters[name][0 if hit else 1] += 1
+
+    def snapshot(self):
+        """
+        counters of every node class.
+        """
+        with self._lock:
+            return {name: {'hits': hits, 'misses': misses} for name, (hits, misses) in self._counters.items()}
+
+    def reset(self):
+        """
+        drop all the counters.
+        """
+        with self._lock:
+            self._counters.clear()
+
+
+stats = CacheStats()
+
+
+def lookup(node):
+    """
+    (key, outputs) of a node with a cache policy, outputs is `MISSING` on a miss.
+    """
+    key = node.cache_policy.make_key(node)
+    if key is None:
+        return None, MISSING
+    outputs = node.cache_policy.cache.get(key, MISSING)
+    stats.record(key[0], outputs is not MISSING)
+    return key, outputs
+
+
+def store(node, key, outputs):
+    """
+    cache the outputs of a node, lazy outputs (generators, map, filter, `QuerySet.iterator()`...)
+    can only be consumed once and are not cached.
+    """
+    if key is None or isinstance(outputs, Iterator):
+        return
+    node.cache_policy.cache.set(key, outputs)
+
+
+class ResponseCache:
+    """
+    Responses of a view flow class in the django cache.
+
+    Every key holds the generation of the flow class, `clear` starts a new generation
+    so all the responses cached before are ignored and left to expire.
+    """
+    prefix = 'arkfbp:response:'
+
+    def __init__(self, name, timeout, alias='default'):
+        self.name = name
+        self.timeout = timeout
+        self.alias = alias
+
+    @property
+    def cache(self):
+        """
+        the django cache.
+        """
+        from django.core.cache import caches    # pylint: disable=import-outside-toplevel
+        return caches[self.alias]
+
+    @property
+    def generation_key(self):
+        """
+        django cache key of the generation.
+        """
+        return f'{self.prefix}{self.name}:generation'
+
+    def make_key(self, path, params=None, user=None):
+        """
+        django cache key of a response, by the path, the varying params and the user.
+        """
+        generation = self.cache.get(self.generation_key, 0)
+        vary = repr((path, sorted((params or {}).items()), user))
+        return f'{self.prefix}{self.name}:{generation}:{hashlib.sha1(vary.encode()).hexdigest()}'
+
+    def get(self, key):
+        """
+        cached response of the key, None on a miss.
+        """
+        return self.cache.get(key)
+
+    def set(self, key, response):
+        """
+        cache the response of the key.
+        """
+        self.cache.set(key, response, self.timeout)
+
+    def delete(self, path, params=None, user=None):
+        """
+        remove the cached response of the path, the params and the user.
+        """
+        self.cache.delete(self.make_key(path, params, user))
+
+    def clear(self):
+        """
+        remove all the cached responses of the flow class.
+        """
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self.cache.set(self.generation_key, 1, None)
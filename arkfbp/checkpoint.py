@@ -0,0 +1,271 @@
+"""
+Checkpoints of long running flows.
+
+A flow with `checkpoint_every = N` saves a checkpoint every N completed nodes:
+the id of the last completed node, the state data and its outputs. When a run with the same
+`flow.checkpoint_key(inputs)` starts again after a crash, it resumes from the successor of that node.
+The key is made of the `run_id` given to `Executer.start_flow`, runs without an id save no checkpoint.
+The checkpoint is deleted when the run ends, unless it ends by an error.
+Nodes with `resumable = False` are never checkpointed, a resumed run starts before them.
+
+The store is configured by `settings.ARKFBP_CHECKPOINT`, or by `flow.checkpoint_store`:
+
+    ARKFBP_CHECKPOINT = {
+        'store': 'sqlite',    # sqlite, file, or the path of a store class
+        'path': None,         # `BASE_DIR/arkfbp_checkpoints.sqlite3`, or the directory `BASE_DIR/arkfbp_checkpoints`
+    }
+
+A store implements `load(key)`, `save(key, payload)` and `delete(key)`, payloads are bytes.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from django.conf import settings
+
+from .utils.util import get_class_from_path
+
+logger = logging.getLogger(__name__)
+
+STORE_SQLITE = 'sqlite'
+STORE_FILE = 'file'
+
+DEFAULT_CONFIG = {
+    'store': STORE_SQLITE,
+    'path': None,
+}
+
+Checkpoint = namedtuple('Checkpoint', ['node_id', 'data', 'outputs', 'count'])
+
+_LOCK = threading.Lock()
+_STORES = {}
+
+
+def get_config():
+    """
+    settings.ARKFBP_CHECKPOINT over the default config.
+    """
+    config = getattr(settings, 'ARKFBP_CHECKPOINT', None) if settings.configured else None
+    return {**DEFAULT_CONFIG, **(config or {})}
+
+
+def dumps(checkpoint):
+    """
+    compressed pickle of a checkpoint.
+    """
+    return zlib.compress(pickle.dumps(tuple(checkpoint), pickle.HIGHEST_PROTOCOL))
+
+
+def loads(payload):
+    """
+    checkpoint of a compressed pickle.
+    """
+    return Checkpoint(*pickle.loads(zlib.decompress(payload)))
+
+
+class SQLiteStore:
+    """
+    Checkpoints in a table of a SQLite file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS checkpoints '
+                               '(key TEXT PRIMARY KEY, payload BLOB NOT NULL, updated_at REAL NOT NULL)')
+
+    def connect(self):
+        """
+        a connection committing when the block ends.
+        """
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, key):
+        """
+        payload of the key, None when there is no checkpoint.
+        """
+        with self.connect() as connection:
+            row = connection.execute('SELECT payload FROM checkpoints WHERE key = ?', (key, )).fetchone()
+        return row[0] if row else None
+
+    def save(self, key, payload):
+        """
+        replace the payload of the key.
+        """
+        with self.connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO checkpoints (key, payload, updated_at) VALUES (?, ?, ?)',
+                               (key, payload, time.time()))
+
+    def delete(self, key):
+        """
+        remove the checkpoint of the key.
+        """
+        with self.connect() as connection:
+            connection.execute('DELETE FROM checkpoints WHERE key = ?', (key, ))
+
+
+class FileStore:
+    """
+    A file per checkpoint in a directory, replaced atomically.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, key):
+        """
+        file of the key.
+        """
+        return os.path.join(self.directory, f'{hashlib.sha1(key.encode()).hexdigest()}.ckpt')
+
+    def load(self, key):
+        """
+        payload of the key, None when there is no checkpoint.
+        """
+        try:
+            with open(self.get_path(key), 'rb') as checkpoint_file:
+                return checkpoint_file.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, payload):
+        """
+        replace the payload of the key.
+        """
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as checkpoint_file:
+            checkpoint_file.write(payload)
+        os.replace(temp_path, self.get_path(key))
+
+    def delete(self, key):
+        """
+        remove the checkpoint of the key.
+        """
+        try:
+            os.remove(self.get_path(key))
+        except FileNotFoundError:
+            pass
+
+
+def get_store(flow=None):
+    """
+    the checkpoint store of the flow, `settings.ARKFBP_CHECKPOINT` by default.
+    """
+    if flow is not None and flow.checkpoint_store is not None:
+        return flow.checkpoint_store
+    config = get_config()
+    base_dir = str(getattr(settings, 'BASE_DIR', None) or os.getcwd()) if settings.configured else os.getcwd()
+    with _LOCK:
+        name = (config['store'], config['path'])
+        if name not in _STORES:
+            if config['store'] == STORE_SQLITE:
+                _STORES[name] = SQLiteStore(config['path'] or os.path.join(base_dir, 'arkfbp_checkpoints.sqlite3'))
+            elif config['store'] == STORE_FILE:
+                _STORES[name] = FileStore(config['path'] or os.path.join(base_dir, 'arkfbp_checkpoints'))
+            else:
+                _STORES[name] = get_class_from_path(config['store'])(config['path'])
+        return _STORES[name]
+
+
+class CheckpointRun:
+    """
+    Checkpoints of one run of a flow.
+    """
+
+    def __init__(self, store, key, count=0, resumed_from=None):
+        self.store = store
+        self.key = key
+        self.count = count
+        self.since = 0
+        self.resumed_from = resumed_from
+
+    def save(self, flow, plan_node, outputs):
+        """
+        save a checkpoint after the node, it is skipped when the data can not be pickled.
+        """
+        checkpoint = Checkpoint(plan_node.id, dict(flow.state.fetch()), outputs, self.count)
+        try:
+            payload = dumps(checkpoint)
+        # pylint: disable=broad-except
+        except Exception as exception:
+            logger.warning('Checkpoint of %s after node %s can not be pickled (%s), it is skipped, '
+                           'the run resumes from its previous checkpoint.', flow, plan_node.id, exception)
+            return
+        self.store.save(self.key, payload)
+        self.since = 0
+
+    def delete(self):
+        """
+        the run ended, remove its checkpoint.
+        """
+        self.store.delete(self.key)
+
+
+def resume(flow, plan):
+    """
+    the first node of a run of the flow, the successor of the checkpointed node if there is a checkpoint.
+    """
+    key = flow.checkpoint_key(flow.inputs)
+    if key is None:
+        flow.checkpoint_run = None
+        return plan.entry
+    store = get_store(flow)
+    payload = store.load(key)
+    checkpoint = loads(payload) if payload is not None else None
+    plan_node = plan.get(checkpoint.node_id) if checkpoint else None
+    if plan_node is None:
+        # no checkpoint, or the graph no longer has the node
+        flow.checkpoint_run = CheckpointRun(store, key)
+        return plan.entry
+
+    flow.checkpoint_run = CheckpointRun(store, key, checkpoint.count, resumed_from=checkpoint.node_id)
+    flow.state.commit(checkpoint.data)
+    flow.outputs = checkpoint.outputs
+    return plan_node.successor(checkpoint.outputs)
+
+
+def finish(flow):
+    """
+    delete the checkpoint of a run which did not end by an error.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .flow.base import FLOW_ERROR
+    if flow.checkpoint_run is not None and not flow.valid_status(FLOW_ERROR):
+        flow.checkpoint_run.delete()
+
+
+class Checkpointer:
+    """
+    Plan observer saving a checkpoint every `flow.checkpoint_every` completed nodes.
+    """
+    # `after_node` writes to the store, the async engine calls it in the thread pool
+    blocking = True
+
+    # pylint: disable=unused-argument, no-self-use
+    def before_node(self, flow, plan_node):
+        """
+        called before a node runs.
+        """
+
+    def after_node(self, flow, plan_node, outputs, token):
+        """
+        called after a node runs.
+        """
+        run = flow.checkpoint_run if flow.checkpoint_every else None
+        if run is None or not flow.valid_status():
+            return
+        run.count += 1
+        run.since += 1
+        if run.since >= flow.checkpoint_every and plan_node.cls.resumable:
+            run.save(flow, plan_node, outputs)
+
+
+CHECKPOINTER = Checkpointer()
@@ -0,0 +1,175 @@
+"""
+Straight-line code generated for static plans.
+
+A plan without IF nodes or cycles always runs its nodes in the same order, it is compiled into one
+function running the lifecycle of every node in sequence, only calling the hooks each node class
+overrides. Plans it can not compile, flows with plan observers or a timed state keep the interpreter.
+Enabled for a flow class by `codegen = True`, or for every flow by `settings.ARKFBP_CODEGEN = True`.
+
+`verify(flow_cls, inputs)` runs a flow with both and returns their differences.
+"""
+import contextlib
+import linecache
+import threading
+
+from django.conf import settings
+
+_LOCK = threading.Lock()
+# the node classes are patched by `verify`, one verification runs at a time
+_VERIFY_LOCK = threading.Lock()
+# a plan which can not be compiled
+NOT_COMPILED = False
+
+
+def enabled(flow):
+    """
+    whether the flow runs compiled plans.
+    """
+    if flow.codegen is not None:
+        return flow.codegen
+    return getattr(settings, 'ARKFBP_CODEGEN', False) if settings.configured else False
+
+
+def linearize(plan):
+    """
+    the plan nodes in running order, None when the plan branches or loops.
+    """
+    nodes = []
+    seen = set()
+    plan_node = plan.entry
+    while plan_node is not None:
+        if plan_node.branching or plan_node.id in seen:
+            return None
+        seen.add(plan_node.id)
+        nodes.append(plan_node)
+        plan_node = plan_node.next
+    return nodes
+
+
+def _node_source(index, plan_node):
+    """
+    lines running one node, the same steps as `Executer.start_node`.
+    """
+    cls = plan_node.cls
+    create = f'P{index}.acquire(flow)' if cls.reusable else f'C{index}()'
+    stop = ['        if not valid_status():', '            return flow.outputs']
+    if cls.cache_policy is not None or cls.cpu_bound:
+        # nodes needing the cache or the process pool go through the executer
+        return [f'        start_node({create}, flow, *args, graph_node=P{index}, **kwargs)'] + stop
+
+    lines = [f'        node = {create}', '        node.flow = flow']
+    for hook in cls.before_init_hooks:
+        lines.append(f'        node.{hook}(*args, **kwargs)')
+        if hook != 'init':
+            lines += stop
+    lines += [
+        f'        node.id = I{index}',
+        '        node.state = state',
+        "        node.inputs = kwargs.get('inputs') or flow.outputs",
+    ]
+    lines += stop
+    for hook in cls.before_run_hooks:
+        lines.append(f'        node.{hook}(*args, **kwargs)')
+        lines += stop
+    lines.append('        outputs = node.run(*args, **kwargs)')
+    lines += stop
+    for hook in cls.after_run_hooks:
+        lines.append(f'        node.{hook}(*args, **kwargs)')
+    lines += ['        node.outputs = outputs', '        flow.outputs = outputs', '        state.push(node)']
+    return lines
+
+
+def compile_plan(plan, start_node):
+    """
+    a function(flow, args, kwargs) running the plan, None when the plan can not be compiled.
+    """
+    nodes = linearize(plan)
+    if not nodes:
+        return None
+
+    namespace = {'start_node': start_node}
+    lines = ['def run_compiled(flow, args, kwargs):', '    state = flow.state', '    valid_status = flow.valid_status']
+    for index, plan_node in enumerate(nodes):
+        namespace.update({f'C{index}': plan_node.cls, f'P{index}': plan_node, f'I{index}': plan_node.id})
+        lines.append(f'    if True:    # {plan_node.id}')
+        lines += _node_source(index, plan_node)
+    lines.append('    return flow.outputs')
+    source = '\n'.join(lines) + '\n'
+
+    # the source is registered so tracebacks show the generated lines
+    filename = f'<arkfbp codegen {id(plan):x}>'
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    exec(compile(source, filename, 'exec'), namespace)    # pylint: disable=exec-used
+    return namespace['run_compiled']
+
+
+def get_compiled(plan, start_node):
+    """
+    the compiled function of a plan, compiled once and kept on the plan. None when it can not be compiled.
+    """
+    if plan.compiled is None:
+        with _LOCK:
+            if plan.compiled is None:
+                plan.compiled = compile_plan(plan, start_node) or NOT_COMPILED
+    return plan.compiled or None
+
+
+@contextlib.contextmanager
+def _record_runs(plan, calls):
+    """
+    append the id of every node whose `run` is called to calls, while the block runs.
+    nodes with a cache policy are left out, their `run` depends on what the previous runs cached.
+    """
+    patched = []
+    for cls in {plan_node.cls for plan_node in plan.nodes if plan_node.cls.cache_policy is None}:
+        run = cls.run
+
+        def recorded_run(node, *args, _run=run, **kwargs):
+            calls.append(node.id)
+            return _run(node, *args, **kwargs)
+
+        patched.append((cls, cls.__dict__.get('run')))
+        cls.run = recorded_run
+    try:
+        yield
+    finally:
+        for cls, run in patched:
+            if run is None:
+                del cls.run
+            else:
+                cls.run = run
+
+
+def _verify_run(flow_cls, codegen, inputs, *args, **kwargs):
+    """
+    run the flow by the interpreter or by the compiled plan, returns what `verify` compares.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .executer import Executer
+    flow = flow_cls()
+    flow.codegen = codegen
+    flow.debug = False
+    calls = []
+    with _VERIFY_LOCK, _record_runs(flow.plan, calls):
+        Executer.start_flow(flow, inputs, *args, **kwargs)
+    return {
+        'status': flow.status,
+        'outputs': flow.outputs,
+        'error': repr(flow.error),
+        'steps': list(flow.state.steps),
+        'state': dict(flow.state.fetch()),
+        'runs': calls,
+    }
+
+
+def verify(flow_cls, inputs, *args, **kwargs):
+    """
+    run the flow by the interpreter and by the compiled plan, returns the differences, empty when they agree.
+    besides the results, the nodes whose `run` was called are compared.
+    """
+    interpreted = _verify_run(flow_cls, False, inputs, *args, **kwargs)
+    compiled = _verify_run(flow_cls, True, inputs, *args, **kwargs)
+    return [
+        f'{key}: interpreter {value!r} != compiled {compiled[key]!r}' for key, value in interpreted.items()
+        if value != compiled[key]
+    ]
@@ -9,6 +9,8 @@ FLOW_CLASS_MAP = {
     'base': 'Flow',
     'view': 'ViewFlow',
     'hook': 'GlobalHookFlow',
+    'async': 'AsyncFlow',
+    'async_view': 'AsyncViewFlow',
 }
 
 
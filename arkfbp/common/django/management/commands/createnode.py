@@ -15,8 +15,11 @@ NODE_CLASS_MAP = {
     'function': 'FunctionNode',
     'if': 'IFNode',
     'loop': 'LoopNode',
+    'map': 'MapNode',
     'nop': 'NopNode',
+    'parallel': 'ParallelNode',
     'api': 'APINode',
+    'fan_out_api': 'FanOutAPINode',
     'test': 'TestNode',
     'auth_token': 'AuthTokenNode',
     'serializer': 'SerializerNode',
@@ -0,0 +1,65 @@
+"""
+run the flows queued by `Executer.submit_flow`
+"""
+import multiprocessing
+import os
+import signal
+
+from django.core.management.base import BaseCommand
+
+from arkfbp.task_queue import get_config, get_task_queue
+
+
+def _work(path, stop, poll_interval, burst):
+    """
+    entry of a worker process, the parent handles SIGINT and SIGTERM and sets the stop event.
+    """
+    # pylint: disable=import-outside-toplevel
+    import django
+    from django.apps import apps
+    from django.db import connections
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    if not apps.ready:
+        django.setup()
+    # connections inherited from the parent must not be shared
+    connections.close_all()
+    get_task_queue(path).work(stop, poll_interval=poll_interval, burst=burst)
+
+
+class Command(BaseCommand):
+    help = "Run the flows queued by Executer.submit_flow in worker processes"
+
+    def handle(self, **options):
+        config = get_config()
+        path = options.get('queue') or config['path']
+        workers = options.get('workers') or os.cpu_count() or 1
+        poll_interval = options.get('poll_interval') or config['poll_interval']
+        burst = options.get('burst')
+        get_task_queue(path)
+
+        stop = multiprocessing.Event()
+
+        def graceful_shutdown(signum, frame):
+            # pylint: disable=unused-argument
+            self.stdout.write('Stopping, the workers finish their current task...')
+            stop.set()
+
+        signal.signal(signal.SIGINT, graceful_shutdown)
+        signal.signal(signal.SIGTERM, graceful_shutdown)
+
+        processes = [
+            multiprocessing.Process(target=_work, args=(path, stop, poll_interval, burst), daemon=False)
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'{workers} workers running the tasks of {path}')
+        for process in processes:
+            process.join()
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Number of worker processes, the number of CPUs by default.')
+        parser.add_argument('--queue', type=str, help='SQLite file of the task queue.')
+        parser.add_argument('--poll_interval', type=float, help='Seconds an idle worker waits for a task.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is left.')
@@ -3,11 +3,13 @@ import json
 from json.decoder import JSONDecodeError
 from os import walk, path
 
+from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.core.management import CommandError
 from django.utils.deprecation import MiddlewareMixin
 
 from arkfbp.executer import Executer
+from arkfbp.flow import AsyncFlow
 from arkfbp.flow.base import FLOW_FROZEN
 
 PROCESS_REQUEST = 'BEFORE_ROUTE'
@@ -71,7 +73,25 @@ def execute(request, process_type, *args, **kwargs):
     inputs = request
     for clz in hooks:
         hook_flow = clz.Main()
-        outputs = Executer.start_flow(hook_flow, inputs, *args, **kwargs)
+        if isinstance(hook_flow, AsyncFlow):
+            outputs = async_to_sync(Executer.start_flow_async)(hook_flow, inputs, *args, **kwargs)
+        else:
+            outputs = Executer.start_flow(hook_flow, inputs, *args, **kwargs)
+        if hook_flow.valid_status(FLOW_FROZEN):
+            return outputs
+
+    return None
+
+
+async def execute_async(request, process_type, *args, **kwargs):
+    hooks = GLOBAL_HOOKS[process_type]
+    if not len(hooks):
+        return None
+
+    inputs = request
+    for clz in hooks:
+        hook_flow = clz.Main()
+        outputs = await Executer.start_flow_async(hook_flow, inputs, *args, **kwargs)
         if hook_flow.valid_status(FLOW_FROZEN):
             return outputs
 
@@ -93,3 +113,30 @@ class GlobalFlowMiddleware(MiddlewareMixin):
     def process_response(self, request, response):
         execute(request, PROCESS_RESPONSE, response=response)
         return response
+
+
+class AsyncGlobalFlowMiddleware(GlobalFlowMiddleware):
+    """
+    GlobalFlowMiddleware for ASGI, hook flows run under the async engine.
+    """
+    sync_capable = False
+    async_capable = True
+
+    async def __acall__(self, request):
+        response = await self.process_request(request)
+        response = response or await self.get_response(request)
+        return await self.process_response(request, response)
+
+    async def process_request(self, request):
+        return await execute_async(request, PROCESS_REQUEST)
+
+    async def process_view(self, request, view_func, view_args, view_kwargs):
+        flow_class = view_func.__dict__.get('view_class', None)
+        return await execute_async(request, PROCESS_VIEW, flow_class=flow_class)
+
+    async def process_exception(self, request, exception):
+        return await execute_async(request, PROCESS_EXCEPTION, exception=exception)
+
+    async def process_response(self, request, response):
+        await execute_async(request, PROCESS_RESPONSE, response=response)
+        return response
@@ -0,0 +1,89 @@
+"""
+Deadlines of flow runs.
+
+A run of a flow is bounded by `flow.timeout`, or by the `run_timeout` (seconds) or `run_deadline`
+(a `time.monotonic()` value) passed to `Executer.start_flow`. Flows started while another one runs
+in the same context inherit its deadline when it is earlier. Nodes read `self.flow.remaining_time()`,
+the executer checks the deadline before every node and calls `flow.on_deadline_exceeded()` once it expired,
+as well as when a node raises `DeadlineExceeded`.
+"""
+import contextvars
+import time
+
+_DEADLINE = contextvars.ContextVar('arkfbp_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    the deadline of a flow expired.
+    """
+
+
+def current():
+    """
+    deadline of the flow running in this context, None when there is none.
+    """
+    return _DEADLINE.get()
+
+
+def remaining(deadline):
+    """
+    seconds left before the deadline, None when there is no deadline.
+    """
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def bound(flow, timeout=None, deadline=None):
+    """
+    set the deadline of a run of the flow, the earliest of the bounds, without making it the one of the context.
+    """
+    now = time.monotonic()
+    bounds = [bound for bound in (deadline, current()) if bound is not None]
+    bounds += [now + seconds for seconds in (timeout, flow.timeout) if seconds is not None]
+    flow.deadline = min(bounds) if bounds else None
+    return flow.deadline
+
+
+def activate(deadline):
+    """
+    make the deadline the one of the context, returns the token passed to `leave`.
+    """
+    return _DEADLINE.set(deadline) if deadline is not None else None
+
+
+def enter(flow, timeout=None, deadline=None):
+    """
+    set the deadline of a run of the flow, the earliest of the bounds. returns the token passed to `leave`.
+    """
+    return activate(bound(flow, timeout, deadline))
+
+
+def leave(token):
+    """
+    restore the deadline of the context when a run ends.
+    """
+    if token is not None:
+        _DEADLINE.reset(token)
+
+
+class DeadlineGuard:
+    """
+    Plan observer ending the flow when its deadline expired before a node.
+    """
+    # pylint: disable=unused-argument, no-self-use
+    def before_node(self, flow, plan_node):
+        """
+        called before a node runs.
+        """
+        if flow.deadline is not None and time.monotonic() >= flow.deadline:
+            flow.on_deadline_exceeded()
+
+    def after_node(self, flow, plan_node, outputs, token):
+        """
+        called after a node runs.
+        """
+
+
+DEADLINE_GUARD = DeadlineGuard()
@@ -5,42 +5,161 @@ import importlib
 import json
 import os
 import sys
+import time
+from inspect import iscoroutinefunction
 
+from asgiref.sync import sync_to_async
 from django.core.management import CommandError
 from django.test import RequestFactory
 
+from . import cache as node_cache
+from . import codegen
+from . import deadline as flow_deadline
+from . import metrics
+from .utils.offload import run_in_process
+
+
+async def _call_async(func, *args, **kwargs):
+    """
+    await a coroutine function, or run a sync function in the thread pool.
+    """
+    if iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await sync_to_async(func, thread_sensitive=False)(*args, **kwargs)
+
 
 class Executer:
     """executer for flows and nodes"""
     @classmethod
-    def start_flow(cls, flow, inputs, *args, **kwargs):
+    def start_flow(cls, flow, inputs, *args, run_timeout=None, run_deadline=None, run_id=None, **kwargs):
         """
         start a flow
+        the run is bounded by `run_timeout` in seconds or the `time.monotonic()` `run_deadline`, see `arkfbp.deadline`.
+        a run with a `run_id` resumes from the checkpoint of the run with the same id, see `arkfbp.checkpoint`.
         """
+        started = metrics.start() if metrics.enabled(flow) else None
+        token = flow_deadline.enter(flow, run_timeout, run_deadline)
+        flow.run_id = run_id
         flow.request = inputs
-        flow.before_initialize(inputs, *args, **kwargs)
+        ret = None
+        response = None
+        try:
+            for hook in flow.before_main_hooks:
+                if not flow.valid_status():
+                    break
+                getattr(flow, hook)(inputs, *args, **kwargs)
+
+            if flow.valid_status():
+                ret = flow.main(inputs, *args, **kwargs)
+
+            for hook in flow.after_main_hooks:
+                if not flow.valid_status():
+                    break
+                getattr(flow, hook)(inputs, ret, *args, **kwargs)
+
+            response = flow.die() if flow.valid_status() else flow.response
+            # the record is written with the final status, an error of the flow is raised by it
+            flow.log_debug()
+        finally:
+            flow_deadline.leave(token)
+            cls.end_run(flow, started, response)
+        return response
 
-        if flow.valid_status():
-            flow.init(inputs, *args, **kwargs)
+    @classmethod
+    def end_run(cls, flow, started, response):
+        """
+        the end of every run: the nodes are given back, the proxied responses not returned are closed
+        and the run is measured from `started`, the `metrics.start()` of the run, None when it is not measured.
+        """
+        cls.release_nodes(flow)
+        cls.close_proxy_responses(flow, response)
+        if started:
+            metrics.record_flow(flow, started)
 
-        if flow.valid_status():
-            flow.initialized(inputs, *args, **kwargs)
+    @staticmethod
+    def release_nodes(flow):
+        """
+        give back the reusable nodes the flow took from its plan.
+        """
+        while flow.leased_nodes:
+            plan_node, node = flow.leased_nodes.pop()
+            plan_node.release(node)
+
+    @staticmethod
+    def close_proxy_responses(flow, response):
+        """
+        close the upstream of the proxied responses the run opened but does not return,
+        the returned one is closed by the server once it is sent.
+        """
+        while flow.proxy_responses:
+            proxied = flow.proxy_responses.pop()
+            if proxied is not response:
+                proxied.upstream.close()
 
-        if flow.valid_status():
-            flow.before_execute(inputs, *args, **kwargs)
+    @classmethod
+    async def start_flow_async(cls, flow, inputs, *args, run_timeout=None, run_deadline=None, run_id=None,
+                               **kwargs):
+        """
+        start a flow under the async engine.
+        coroutine hooks are awaited, sync hooks run in the thread pool.
+        """
+        started = metrics.start() if metrics.enabled(flow) else None
+        token = flow_deadline.enter(flow, run_timeout, run_deadline)
+        flow.run_id = run_id
+        flow.request = inputs
+        ret = None
+        response = None
+        try:
+            for hook in flow.before_main_hooks:
+                if not flow.valid_status():
+                    break
+                await _call_async(getattr(flow, hook), inputs, *args, **kwargs)
 
-        if flow.valid_status():
-            ret = flow.main(inputs, *args, **kwargs)
+            if flow.valid_status():
+                ret = await _call_async(flow.main, inputs, *args, **kwargs)
 
-        if flow.valid_status():
-            flow.executed(inputs, ret, *args, **kwargs)
+            for hook in flow.after_main_hooks:
+                if not flow.valid_status():
+                    break
+                await _call_async(getattr(flow, hook), inputs, ret, *args, **kwargs)
 
-        if flow.valid_status():
-            flow.before_destroy(inputs, ret, *args, **kwargs)
-        flow.log_debug()
-        response = flow.die() if flow.valid_status() else flow.response
+            response = flow.die() if flow.valid_status() else flow.response
+            # the record is written with the final status, an error of the flow is raised by it
+            flow.log_debug()
+        finally:
+            flow_deadline.leave(token)
+            cls.end_run(flow, started, response)
         return response
 
+    @classmethod
+    def start_flows(cls, flow_cls, inputs_iterable, *args, **kwargs):
+        """
+        Start the same flow for every inputs of an iterable, returns a list of `FlowResult`,
+        or a generator of them when `lazy` is True.
+
+        The flow is initialized once and cloned for each inputs, the debug log is not written.
+        Inputs are walked through the graph in batches of `batch_size`: at every step the items
+        standing on the same node run together, and a node class defining
+        `run_batch(self, inputs_list, *args, **kwargs)` receives all of their inputs at once and
+        returns the list of their outputs; `node.flows` holds the flow of each item.
+        Lifecycle hooks of such a node are not called, the state of each flow records a node with its own
+        inputs and outputs. The plan observers of every flow (metrics, checkpoints) are called around each node.
+        See `arkfbp.batch`.
+        """
+        # pylint: disable=import-outside-toplevel
+        from .batch import start_flows
+        return start_flows(flow_cls, inputs_iterable, *args, **kwargs)
+
+    @classmethod
+    def submit_flow(cls, flow_path, inputs=None, priority=0, max_retries=None):
+        """
+        queue a flow to be run by the `runworkers` command, returns a `TaskHandle`.
+        the inputs and the outputs of the flow are stored as JSON.
+        """
+        # pylint: disable=import-outside-toplevel
+        from .task_queue import get_task_queue
+        return get_task_queue().put(flow_path, inputs, priority=priority, max_retries=max_retries)
+
     @classmethod
     def cli_start_flow(cls, flow, inputs, *args, **kwargs):
         """
@@ -131,38 +250,163 @@ class Executer:
             except Exception as exception:
                 sys.stdout.write(exception.__str__())
 
+    @classmethod
+    def run_plan(cls, plan, flow, *args, **kwargs):
+        """
+        walk a compiled plan from its entry node.
+        """
+        observers = flow.plan_observers()
+        if observers:
+            return cls._run_plan_observed(plan, flow, observers, *args, **kwargs)
+
+        plan_node = flow.plan_entry(plan)
+        if plan_node is plan.entry and codegen.enabled(flow) and not flow.state.timed:
+            compiled = codegen.get_compiled(plan, cls.start_node)
+            if compiled is not None:
+                return compiled(flow, args, kwargs)
+
+        while plan_node:
+            # 获取`node`实例并运行
+            outputs = cls.start_node(plan_node.acquire(flow), flow, *args, graph_node=plan_node, **kwargs)
+            if not flow.valid_status():
+                return flow.outputs
+            plan_node = plan_node.successor(outputs)
+        return flow.outputs
+
+    @classmethod
+    def _run_plan_observed(cls, plan, flow, observers, *args, **kwargs):
+        """
+        walk a compiled plan, calling `before_node` and `after_node` of the observers around every node.
+        an observer can stop the flow in `before_node`.
+        """
+        plan_node = flow.plan_entry(plan)
+        while plan_node:
+            tokens = [observer.before_node(flow, plan_node) for observer in observers]
+            if not flow.valid_status():
+                return flow.outputs
+            outputs = cls.start_node(plan_node.acquire(flow), flow, *args, graph_node=plan_node, **kwargs)
+            for observer, token in zip(observers, tokens):
+                observer.after_node(flow, plan_node, outputs, token)
+            if not flow.valid_status():
+                return flow.outputs
+            plan_node = plan_node.successor(outputs)
+        return flow.outputs
+
+    @classmethod
+    async def run_plan_async(cls, plan, flow, *args, **kwargs):
+        """
+        walk a compiled plan from its entry node under the async engine.
+        the checkpoint store and the blocking observers are called in the thread pool.
+        """
+        observers = flow.plan_observers()
+        if flow.checkpoint_every:
+            plan_node = await sync_to_async(flow.plan_entry, thread_sensitive=False)(plan)
+        else:
+            plan_node = flow.plan_entry(plan)
+        while plan_node:
+            tokens = [observer.before_node(flow, plan_node) for observer in observers]
+            if not flow.valid_status():
+                return flow.outputs
+            outputs = await cls.start_node_async(plan_node.acquire(flow), flow, *args, graph_node=plan_node, **kwargs)
+            for observer, token in zip(observers, tokens):
+                if getattr(observer, 'blocking', False):
+                    await sync_to_async(observer.after_node, thread_sensitive=False)(flow, plan_node, outputs, token)
+                else:
+                    observer.after_node(flow, plan_node, outputs, token)
+            if not flow.valid_status():
+                return flow.outputs
+            plan_node = plan_node.successor(outputs)
+        return flow.outputs
+
     @classmethod
     def start_node(cls, node, flow, *args, graph_node=None, **kwargs):
         """
         start a node
         """
+        started = time.perf_counter() if flow.state.timed else None
         node.flow = flow
+        outputs = None
+        if not flow.valid_status():
+            return outputs
+
+        # only the lifecycle hooks overridden by the node class are called,
+        # the flow status can not change between two skipped hooks.
+        for hook in node.before_init_hooks:
+            getattr(node, hook)(*args, **kwargs)
+            if hook != 'init' and not flow.valid_status():
+                return outputs
+
+        node.id = graph_node.id if graph_node else node.__class__.__name__
+        node.state = flow.state
+        node.inputs = kwargs.get('inputs') or flow.outputs
+        if not flow.valid_status():
+            return outputs
+
+        for hook in node.before_run_hooks:
+            getattr(node, hook)(*args, **kwargs)
+            if not flow.valid_status():
+                return outputs
+
+        key, outputs = node_cache.lookup(node) if node.cache_policy else (None, node_cache.MISSING)
+        if outputs is node_cache.MISSING:
+            outputs = run_in_process(node, *args, **kwargs) if node.cpu_bound else node.run(*args, **kwargs)
+            if not flow.valid_status():
+                return outputs
+            node_cache.store(node, key, outputs)
 
-        if flow.valid_status():
-            node.created(*args, **kwargs)
+        for hook in node.after_run_hooks:
+            getattr(node, hook)(*args, **kwargs)
+        node.outputs = outputs
+        flow.outputs = outputs
+        flow.state.push(node, duration=time.perf_counter() - started if started else None)
 
-        if flow.valid_status():
-            node.before_initialize(*args, **kwargs)
+        return outputs
+
+    @classmethod
+    async def start_node_async(cls, node, flow, *args, graph_node=None, **kwargs):
+        """
+        start a node under the async engine.
+        a sync node runs its whole lifecycle by `start_node` in the thread pool.
+        """
+        if not node.asynchronous:
+            if node.blocking:
+                start_node = sync_to_async(cls.start_node, thread_sensitive=False)
+                return await start_node(node, flow, *args, graph_node=graph_node, **kwargs)
+            return cls.start_node(node, flow, *args, graph_node=graph_node, **kwargs)
+
+        started = time.perf_counter() if flow.state.timed else None
+        node.flow = flow
+        outputs = None
+        if not flow.valid_status():
+            return outputs
 
-        if flow.valid_status():
-            node.init(*args, **kwargs)
-            node.id = graph_node.id if graph_node else node.__class__.__name__
-            node.state = flow.state
-            node.inputs = kwargs.get('inputs') or flow.outputs
+        for hook in node.before_init_hooks:
+            await _call_async(getattr(node, hook), *args, **kwargs)
+            if hook != 'init' and not flow.valid_status():
+                return outputs
 
-        if flow.valid_status():
-            node.initialized(*args, **kwargs)
+        node.id = graph_node.id if graph_node else node.__class__.__name__
+        node.state = flow.state
+        node.inputs = kwargs.get('inputs') or flow.outputs
+        if not flow.valid_status():
+            return outputs
 
-        if flow.valid_status():
-            node.before_execute(*args, **kwargs)
+        for hook in node.before_run_hooks:
+            await _call_async(getattr(node, hook), *args, **kwargs)
+            if not flow.valid_status():
+                return outputs
 
-        if flow.valid_status():
-            outputs = node.run(*args, **kwargs)
+        key, outputs = node_cache.lookup(node) if node.cache_policy else (None, node_cache.MISSING)
+        if outputs is node_cache.MISSING:
+            outputs = await _call_async(getattr(node, 'run_async', node.run), *args, **kwargs)
+            if not flow.valid_status():
+                return outputs
+            node_cache.store(node, key, outputs)
 
-        if flow.valid_status():
-            node.executed(*args, **kwargs)
-            node.outputs = outputs
-            flow.outputs = outputs
-            flow.state.push(node)
+        for hook in node.after_run_hooks:
+            await _call_async(getattr(node, hook), *args, **kwargs)
+        node.outputs = outputs
+        flow.outputs = outputs
+        flow.state.push(node, duration=time.perf_counter() - started if started else None)
 
         return outputs
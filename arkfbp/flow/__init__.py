@@ -1,2 +1,4 @@
 from .base import Flow
 from .view_flow import ViewFlow
+from .async_flow import AsyncFlow
+from .async_view_flow import AsyncViewFlow
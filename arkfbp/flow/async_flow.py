@@ -0,0 +1,32 @@
+"""
+Async Flow.
+"""
+from asgiref.sync import sync_to_async
+
+from arkfbp import checkpoint as flow_checkpoint
+from arkfbp import deadline as flow_deadline
+from arkfbp.executer import Executer
+from .base import Flow
+
+
+class AsyncFlow(Flow):
+    """
+    flow for the async engine, it must be started by `Executer.start_flow_async`.
+    nodes in it can define `async def run`, sync nodes run in a thread pool.
+    """
+    async def main(self, inputs, *args, **kwargs):
+        """
+        main function of a flow.
+        """
+        self.begin(inputs)
+        try:
+            await Executer.run_plan_async(self.plan, self, *args, **kwargs)
+        except flow_deadline.DeadlineExceeded:
+            self.on_deadline_exceeded()
+        # pylint:disable=broad-except
+        except Exception as exception:
+            self.terminate(exception)
+        if self.checkpoint_every:
+            await sync_to_async(flow_checkpoint.finish, thread_sensitive=False)(self)
+
+        return self.outputs
@@ -0,0 +1,43 @@
+"""
+Async View Flow.
+"""
+from functools import update_wrapper
+
+from django.utils.decorators import classonlymethod
+
+from arkfbp.executer import Executer
+from .async_flow import AsyncFlow
+from .view_flow import ViewFlow
+
+
+# pylint: disable=abstract-method
+class AsyncViewFlow(AsyncFlow, ViewFlow):
+    """
+    django async view, served natively under ASGI.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        override django view function dispatch.
+        """
+        if request.method.upper() in self.allow_http_method:
+            return await Executer.start_flow_async(self, request, *args, **kwargs)
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        """
+        django only treats a coroutine function as an async view.
+        """
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        update_wrapper(async_view, view)
+        return async_view
+
+    async def before_execute(self, inputs, *args, **kwargs):
+        """
+        check permission.
+        """
+        for node in self.get_permissions():
+            _ = await Executer.start_node_async(node, self, *args, **kwargs)
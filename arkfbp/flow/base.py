@@ -2,14 +2,18 @@
 Base flow.
 """
 import abc
-import sys
+import copy
 
-from cachetools import cached
-from cachetools.keys import hashkey
+from django.conf import settings
 
+from arkfbp import checkpoint as flow_checkpoint
+from arkfbp import deadline as flow_deadline
+from arkfbp import log as flow_log
+from arkfbp import metrics as flow_metrics
 from arkfbp.executer import Executer
-from ..graph import Graph, GraphParser
-from ..state import AppState, FlowState
+from ..graph import Graph, get_plan
+from ..state import AppState, FlowState, RETENTION_FULL
+from ..utils.util import overridden_methods
 
 FLOW_RUNNING = 'RUNNING'
 FLOW_CREATED = 'CREATED'
@@ -18,6 +22,10 @@ FLOW_STOPPED = 'STOPPED'
 FLOW_FROZEN = 'FROZEN'
 FLOW_STATUS = (FLOW_CREATED, FLOW_RUNNING, FLOW_ERROR, FLOW_STOPPED, FLOW_FROZEN)
 
+# Flow lifecycle hooks, grouped by the step of `Executer.start_flow` running them
+BEFORE_MAIN_HOOKS = ('before_initialize', 'init', 'initialized', 'before_execute')
+AFTER_MAIN_HOOKS = ('executed', 'before_destroy')
+
 
 class Flow:
     """
@@ -26,24 +34,86 @@ class Flow:
     inputs = None
     outputs = None
     debug = True
+    # part of the runs logged when debug is True, None follows `settings.ARKFBP_FLOW_LOG`
+    log_sample_rate = None
+    # node history kept by the flow state: full, ring, summary or none,
+    # None follows `settings.ARKFBP_STATE_RETENTION`
+    state_retention = None
+    # number of nodes kept by the ring retention, None follows `settings.ARKFBP_STATE_RETENTION_SIZE`
+    state_retention_size = None
+    # measure the flow and its nodes, None follows `settings.ARKFBP_METRICS`
+    metrics = None
+    # save a checkpoint every N completed nodes, a run interrupted resumes from it, None disables checkpoints
+    checkpoint_every = None
+    # store of the checkpoints, None follows `settings.ARKFBP_CHECKPOINT`
+    checkpoint_store = None
+    # checkpoints of the current run
+    checkpoint_run = None
+    # id of the current run given to `Executer.start_flow`, a run started again with the same id
+    # resumes from its checkpoint
+    run_id = None
+    # seconds a run may take, None for no limit besides the deadline inherited from the caller
+    timeout = None
+    # `time.monotonic()` deadline of the current run, see `arkfbp.deadline`
+    deadline = None
+    # run a plan without IF nodes or cycles as generated code, None follows `settings.ARKFBP_CODEGEN`
+    codegen = None
+
+    # lifecycle hooks overridden by the flow class, only these are called by the executer
+    before_main_hooks = ()
+    after_main_hooks = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.before_main_hooks = overridden_methods(cls, Flow, BEFORE_MAIN_HOOKS)
+        cls.after_main_hooks = overridden_methods(cls, Flow, AFTER_MAIN_HOOKS)
 
     def __init__(self):
-        self.graph = self.create_graph()
-        self._state = FlowState()
+        self.plan = get_plan(self)
+        self.graph = self.plan.graph
+        retention, size = self.get_state_retention()
+        self._state = FlowState(retention=retention, size=size)
         self._app_state = AppState()
         manual_state = self.create_state()
         if isinstance(manual_state, dict):
             self.state.commit(manual_state)
         self._request = None
         self._response = None
-        self._status = 'CREATED'
+        self._status = FLOW_CREATED
         self.error = None
+        # reusable nodes taken from the plan by this run, see `PlanNode.acquire`
+        self.leased_nodes = []
+        # proxied responses opened by this run, their upstream is closed when the run does not return them
+        self.proxy_responses = []
         # 根据 Nodes & Edges 设置 next
 
     # pylint: disable=missing-function-docstring
     def __str__(self):
         return f'Flow: {self.__class__}'
 
+    def clone(self):
+        """
+        A new flow of the same class for another run, without going through `__init__` again.
+        the state is created anew by `create_state`, runs never share its mutable values.
+        """
+        flow = copy.copy(self)
+        flow._state = FlowState(retention=self._state.retention, size=self._state.size)
+        manual_state = flow.create_state()
+        if isinstance(manual_state, dict):
+            flow.state.commit(manual_state)
+        flow._request = None
+        flow._response = None
+        flow._status = FLOW_CREATED
+        flow.error = None
+        flow.inputs = None
+        flow.outputs = None
+        flow.checkpoint_run = None
+        flow.run_id = None
+        flow.deadline = None
+        flow.leased_nodes = []
+        flow.proxy_responses = []
+        return flow
+
     # pylint: disable=missing-function-docstring
     def __repr__(self):
         return self.__str__()
@@ -62,6 +132,13 @@ class Flow:
         """
         return self._state
 
+    @property
+    def metrics_name(self):
+        """
+        name of the flow in metrics.
+        """
+        return f'{self.__class__.__module__}.{self.__class__.__qualname__}'
+
     @property
     def request(self):
         """
@@ -80,10 +157,10 @@ class Flow:
         """
         return self.outputs
 
-    @cached(cache={}, key=lambda self: hashkey(self.__str__()))
     def create_graph(self):
         """
         Returns the node information in JSON form.
+        It is only called once per flow class, when the plan is compiled.
         """
         graph = Graph()
         graph.graph_nodes = self.create_nodes()
@@ -97,6 +174,15 @@ class Flow:
         """
         raise NotImplementedError
 
+    def get_state_retention(self):
+        """
+        node history kept by the flow state, (retention, ring size).
+        """
+        conf = settings if settings.configured else None
+        retention = self.state_retention or getattr(conf, 'ARKFBP_STATE_RETENTION', RETENTION_FULL)
+        size = self.state_retention_size or getattr(conf, 'ARKFBP_STATE_RETENTION_SIZE', None)
+        return retention, size
+
     def create_state(self):
         """
         flow can override this function.
@@ -107,28 +193,70 @@ class Flow:
         """
         main function of a flow.
         """
-        if inputs is not None:
-            self.inputs = inputs
-            self.outputs = inputs
-        self._status = FLOW_RUNNING
+        self.begin(inputs)
         try:
-            graph_parser = GraphParser(self.graph)
-            graph_node = graph_parser.get_entry_node()
-            while graph_node:
-                # 获取`node`实例
-                graph_node = graph_parser.parse_graph_node(graph_node)
-                node = graph_node.instance
-                # 运行`node`实例
-                outputs = Executer.start_node(node, self, graph_node, *args, **kwargs)
-                if not self.valid_status():
-                    return self.outputs
-                graph_node = graph_node.next_graph_node(outputs)
+            Executer.run_plan(self.plan, self, *args, **kwargs)
+        except flow_deadline.DeadlineExceeded:
+            self.on_deadline_exceeded()
         # pylint:disable=broad-except
         except Exception as exception:
             self.terminate(exception)
+        if self.checkpoint_every:
+            flow_checkpoint.finish(self)
 
         return self.outputs
 
+    def plan_observers(self):
+        """
+        Observers called around every node while the plan is walked, see `Executer.run_plan`.
+        """
+        observers = []
+        if flow_metrics.enabled(self):
+            observers.append(flow_metrics.NODE_TIMER)
+        if self.checkpoint_every:
+            observers.append(flow_checkpoint.CHECKPOINTER)
+        if self.deadline is not None:
+            observers.append(flow_deadline.DEADLINE_GUARD)
+        return observers
+
+    def remaining_time(self):
+        """
+        seconds left before the deadline of the run, None when it has no deadline.
+        """
+        return flow_deadline.remaining(self.deadline)
+
+    def on_deadline_exceeded(self):
+        """
+        the deadline expired before a node or a node raised `DeadlineExceeded`, the flow ends with an error.
+        """
+        self.terminate(flow_deadline.DeadlineExceeded(f'{self} exceeded its deadline'))
+
+    def plan_entry(self, plan):
+        """
+        the first node walked in the plan, the flow resumes from its checkpoint when it has one.
+        """
+        if self.checkpoint_every and plan is self.plan:
+            return flow_checkpoint.resume(self, plan)
+        return plan.entry
+
+    def checkpoint_key(self, inputs):
+        """
+        key of the checkpoint of a run, by its `run_id`.
+        None when the run has no id, nothing could resume it and it saves no checkpoint.
+        """
+        if self.run_id is None:
+            return None
+        return f'{self.metrics_name}:{self.run_id}'
+
+    def begin(self, inputs):
+        """
+        the flow starts running with the inputs.
+        """
+        if inputs is not None:
+            self.inputs = inputs
+            self.outputs = inputs
+        self._status = FLOW_RUNNING
+
     def shutdown(self, outputs):
         """
         Manually stop a workflow.
@@ -153,21 +281,15 @@ class Flow:
 
     def log_debug(self):
         """
-        debug for a flow info when it runs.
+        debug for a flow info when it runs, written by `arkfbp.log`.
         """
         if not self.debug:
             return
 
-        sys.stdout.write(f'------------- DEBUG BEGIN ({self}) -------------\n\n')
-        for node in self._state.nodes:
-            sys.stdout.write(f'****** {node} ******\n')
-            sys.stdout.write(f'ID: {node.id}\n')
-            sys.stdout.write(f'Inputs: {node.inputs}\n')
-            sys.stdout.write(f'Outputs: {node.outputs}\n')
-            sys.stdout.write('****** END *******\n\n')
-        if self.valid_status(target=FLOW_ERROR):
+        error = self.error if self.valid_status(target=FLOW_ERROR) else None
+        flow_log.log_flow(self, error=error)
+        if error is not None:
             raise self.error
-        sys.stdout.write(f'------------- DEBUG END ({self}) -------------\n')
 
     def before_initialize(self, *args, **kwargs):
         """
@@ -0,0 +1,93 @@
+"""
+Branch Flow.
+"""
+from .base import FLOW_RUNNING, FLOW_ERROR, FLOW_STOPPED, FLOW_FROZEN, FLOW_STATUS
+
+
+class BranchFlow:
+    """
+    The view of a flow inside one branch of a parallel node.
+    It has its own outputs, status and a deep copy of the flow state data,
+    everything else is read from the flow it belongs to.
+    """
+    # only the flow itself is checkpointed
+    checkpoint_every = None
+    def __init__(self, flow, plan, inputs, cancelled):
+        self.flow = flow
+        self.plan = plan
+        self.inputs = inputs
+        self.outputs = inputs
+        self.error = None
+        self.shutdown_kwargs = {}
+        # branches run at the same time, they share no mutable value of the state
+        self._state = flow.state.copy(deep=True)
+        self._status = FLOW_RUNNING
+        self._cancelled = cancelled
+
+    def __getattr__(self, name):
+        return getattr(self.flow, name)
+
+    def __str__(self):
+        return f'Branch of {self.flow}'
+
+    @property
+    def status(self):
+        """
+        status of the branch.
+        """
+        return self._status
+
+    @property
+    def state(self):
+        """
+        state of the branch.
+        """
+        return self._state
+
+    @property
+    def response(self):
+        """
+        outputs of the branch.
+        """
+        return self.outputs
+
+    @property
+    def aborted(self):
+        """
+        the branch ended by shutdown or an exception.
+        """
+        return self._status in [FLOW_ERROR, FLOW_FROZEN]
+
+    def shutdown(self, outputs, **kwargs):
+        """
+        stop the branch, the parallel node will shutdown the flow with the same arguments.
+        """
+        self._status = FLOW_FROZEN
+        self.outputs = outputs
+        self.shutdown_kwargs = kwargs
+        return outputs
+
+    def on_deadline_exceeded(self):
+        """
+        the branch ends the way the flow would.
+        """
+        self.flow.__class__.on_deadline_exceeded(self)
+
+    def terminate(self, exception):
+        """
+        when a exception raises in a branch,it will be called.
+        """
+        self._status = FLOW_ERROR
+        self.error = exception
+
+    def valid_status(self, target=None):
+        """
+        a branch also stops running when one of its siblings fails.
+        """
+        if target in FLOW_STATUS:
+            return target == self._status
+
+        if self._status in [FLOW_STOPPED, FLOW_ERROR, FLOW_FROZEN] or self._cancelled.is_set():
+            return False
+
+        return True
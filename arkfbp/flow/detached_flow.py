@@ -0,0 +1,68 @@
+"""
+Detached Flow.
+"""
+from .. import deadline as flow_deadline
+from ..state import FlowState
+from .base import FLOW_RUNNING, FLOW_ERROR, FLOW_STOPPED, FLOW_FROZEN, FLOW_STATUS
+
+
+class DetachedFlow:
+    """
+    The flow seen by a node running in another process.
+    It only carries a copy of the flow state and records a shutdown,
+    which is replayed on the real flow when the node returns.
+    """
+    request = None
+
+    def __init__(self, state_data=None, deadline=None):
+        self.deadline = deadline
+        self.outputs = None
+        self.shutdown_args = None
+        self._state = FlowState()
+        self._state.commit(state_data or {})
+        self._status = FLOW_RUNNING
+
+    @property
+    def status(self):
+        """
+        status of flow.
+        """
+        return self._status
+
+    @property
+    def state(self):
+        """
+        state of flow.
+        """
+        return self._state
+
+    @property
+    def response(self):
+        """
+        outputs of flow.
+        """
+        return self.outputs
+
+    def remaining_time(self):
+        """
+        seconds left before the deadline of the flow, None when it has no deadline.
+        """
+        return flow_deadline.remaining(self.deadline)
+
+    def shutdown(self, outputs, **kwargs):
+        """
+        record the shutdown for the real flow.
+        """
+        self._status = FLOW_FROZEN
+        self.outputs = outputs
+        self.shutdown_args = (outputs, kwargs)
+        return outputs
+
+    def valid_status(self, target=None):
+        """
+        Verify the state of a flow to determine whether to continue running.
+        """
+        if target in FLOW_STATUS:
+            return target == self._status
+
+        return self._status not in [FLOW_STOPPED, FLOW_ERROR, FLOW_FROZEN]
@@ -1,12 +1,20 @@
 """
 View Flow.
 """
+from collections.abc import Iterator
+
 from django.http import JsonResponse, HttpResponse
+from django.http.response import HttpResponseBase
 from django.utils.decorators import classonlymethod
 from django.views import View
 
+from arkfbp.cache import ResponseCache
 from arkfbp.executer import Executer
-from .base import Flow
+from arkfbp.utils.streaming import STREAM_NDJSON, stream_response
+from .base import Flow, FLOW_STOPPED
+
+# request methods served from the response cache
+CACHE_METHODS = ('GET', 'HEAD')
 
 
 # pylint: disable=abstract-method
@@ -21,14 +29,89 @@ class ViewFlow(Flow, View):
     response_status = 200
     authentication_node_classes = []
     permission_node_classes = []
+    # seconds a response of GET and HEAD requests is cached, None disables the response cache
+    cache_timeout = None
+    # params of `request.ds` varying the cached response
+    cache_vary_params = ()
+    # vary the cached response by the authenticated user
+    cache_vary_user = False
+    # alias of the django cache in `settings.CACHES`
+    cache_alias = 'default'
+    # encoding of the streamed response when the outputs are a generator or an iterator:
+    # ndjson, csv or json (a JSON array)
+    stream_format = STREAM_NDJSON
+    # response of a run exceeding its deadline, see `Flow.timeout`
+    deadline_response = {'detail': 'Request timed out'}
+    deadline_response_status = 504
 
     def dispatch(self, request, *args, **kwargs):
         """
         override django view function dispatch.
         """
-        if request.method.upper() in self.allow_http_method:
+        method = request.method.upper()
+        if method not in self.allow_http_method:
+            return None
+        if not self.cache_timeout or method not in CACHE_METHODS:
             return Executer.start_flow(self, request, *args, **kwargs)
 
+        # the BEFORE_FLOW hooks of GlobalFlowMiddleware already ran, the hooks before `main`
+        # (`before_execute` checks the permissions) still run on a hit and can reject the request
+        cache = self.get_response_cache()
+        key = cache.make_key(*self.get_cache_vary(request))
+        response = cache.get(key)
+        if response is not None:
+            self.request = request
+            for hook in self.before_main_hooks:
+                if not self.valid_status():
+                    break
+                getattr(self, hook)(request, *args, **kwargs)
+            return response if self.valid_status() else self.response
+
+        response = Executer.start_flow(self, request, *args, **kwargs)
+        if self.cacheable(response):
+            cache.set(key, response)
+        return response
+
+    @classmethod
+    def get_response_cache(cls):
+        """
+        the response cache of the flow class.
+        """
+        return ResponseCache(f'{cls.__module__}.{cls.__qualname__}', cls.cache_timeout, cls.cache_alias)
+
+    def get_cache_vary(self, request):
+        """
+        (path, params, user) varying the cached response of the request.
+        """
+        ds = getattr(request, 'ds', request.GET)
+        params = {param: ds.get(param) for param in self.cache_vary_params}
+        user = None
+        if self.cache_vary_user:
+            user = getattr(request, 'user', None)
+            user = user.pk if user is not None and user.is_authenticated else None
+        return request.path, params, user
+
+    def cacheable(self, response):
+        """
+        only a complete response of a flow ending normally is cached.
+        """
+        return (self.valid_status(FLOW_STOPPED) and isinstance(response, HttpResponse)
+                and response.status_code == 200 and not response.cookies)
+
+    @classmethod
+    def invalidate_response(cls, path, params=None, user=None):
+        """
+        remove the cached response of the path, the params of `cache_vary_params` and the user pk.
+        """
+        cls.get_response_cache().delete(path, params, user)
+
+    @classmethod
+    def invalidate_responses(cls):
+        """
+        remove all the cached responses of the flow class.
+        """
+        cls.get_response_cache().clear()
+
     @classmethod
     def set_http_method(cls, method: list):
         """
@@ -43,7 +126,7 @@ class ViewFlow(Flow, View):
         """
         if http_method:
             cls.set_http_method(http_method)
-        return super().as_view(**initkwargs)
+        return cls.as_view(**initkwargs)
 
     def shutdown(self, outputs, **kwargs):
         """
@@ -59,6 +142,13 @@ class ViewFlow(Flow, View):
         """
         if not self.response_type:
             return self._response
+        if isinstance(self.outputs, HttpResponseBase):
+            self._response = self.outputs
+            return self._response
+        if isinstance(self.outputs, Iterator):
+            # lazy outputs are encoded while the server sends them, in constant memory
+            self._response = stream_response(self.outputs, self.stream_format, self.response_status)
+            return self._response
         try:
             self._response = self.response_type(self.outputs, status=self.response_status)
         except TypeError:
@@ -74,15 +164,27 @@ class ViewFlow(Flow, View):
 
         return self._response
 
+    def on_deadline_exceeded(self):
+        """
+        the deadline expired before a node or a node raised `DeadlineExceeded`, respond with `deadline_response`.
+        """
+        self.shutdown(self.deadline_response, response_status=self.deadline_response_status)
+
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this flow requires.
         """
         return [permission() for permission in self.permission_node_classes]
 
-    def before_execute(self, inputs, *args, **kwargs):
+    def check_permissions(self, inputs, *args, **kwargs):
         """
-        check permission.
+        run the permission nodes, a node denies the request by shutting down the flow.
         """
         for node in self.get_permissions():
             _ = Executer.start_node(node, self, *args, **kwargs)
+
+    def before_execute(self, inputs, *args, **kwargs):
+        """
+        check permission.
+        """
+        self.check_permissions(inputs, *args, **kwargs)
@@ -1,7 +1,10 @@
-from cachetools import cached
-from cachetools.keys import hashkey
+from collections.abc import AsyncIterator, Iterator
+from types import MappingProxyType
 
-from .node import IFNode, StartNode
+from .node import IFNode, ParallelNode, StartNode
+
+# instances of a reusable node kept by its plan node
+POOL_SIZE = 64
 
 
 class Graph:
@@ -68,23 +71,107 @@ class GraphNode:
         return graph_node
 
 
+class PlanNode:
+    """
+    A compiled graph node, its successors are resolved to other plan nodes.
+    """
+    __slots__ = ('graph_node', 'cls', 'id', 'branching', 'next', 'positive_next', 'negative_next', 'branches', 'pool')
+
+    def __init__(self, graph_node):
+        self.graph_node = graph_node
+        self.cls = graph_node.cls
+        self.id = graph_node.id
+        self.branching = issubclass(graph_node.cls, IFNode)
+        self.next = None
+        self.positive_next = None
+        self.negative_next = None
+        self.branches = None
+        # released instances of a reusable node class
+        self.pool = []
+
+    def __repr__(self):
+        return f'PlanNode: {self.id}:({self.cls})'
+
+    @property
+    def instance(self):
+        return self.cls()
+
+    def acquire(self, flow):
+        """
+        an instance of the node for the flow, taken from the pool when the node class is reusable
+        and the flow state does not keep the node instances. it is released when the flow ends.
+        """
+        if not self.cls.reusable or flow.state.keeps_nodes:
+            return self.cls()
+        try:
+            node = self.pool.pop()
+        except IndexError:
+            node = self.cls()
+        flow.leased_nodes.append((self, node))
+        return node
+
+    def release(self, node):
+        """
+        give back an instance taken by `acquire`.
+        a node whose outputs are still lazy may be used by them after the flow, it is not reused.
+        """
+        if isinstance(node.outputs, (Iterator, AsyncIterator)):
+            return
+        node.reset()
+        if len(self.pool) < POOL_SIZE:
+            self.pool.append(node)
+
+    def successor(self, outputs):
+        """
+        the plan node to run after this one.
+        """
+        if self.branching:
+            return self.positive_next if outputs else self.negative_next
+        return self.next
+
+
+class GraphPlan:
+    """
+    Immutable execution plan of a graph, compiled once per flow class.
+    """
+    __slots__ = ('graph', 'nodes', 'index', 'entry', 'compiled')
+
+    def __init__(self, graph, nodes, entry):
+        self.graph = graph
+        self.nodes = tuple(nodes)
+        self.index = MappingProxyType({node.id: node for node in self.nodes})
+        self.entry = entry
+        # straight-line function of the plan, see `arkfbp.codegen`
+        self.compiled = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get(self, node_id):
+        return self.index.get(node_id)
+
+
 class GraphParser:
 
     def __init__(self, graph):
         self.graph = graph
+        self._index = None
 
     def parse_graph_node(self, _graph_node):
         graph_node = GraphNode(_graph_node, handler=self)
         return graph_node
 
     def get_graph_node(self, node_id):
-        for graph_node in self.graph.graph_nodes:
-            if graph_node['id'] == node_id:
-                return graph_node
-
-        raise Exception(f'Node ID:{node_id} not found')
+        if self._index is None:
+            self._index = {}
+            for graph_node in self.graph.graph_nodes:
+                self._index.setdefault(graph_node['id'], graph_node)
+
+        graph_node = self._index.get(node_id)
+        if graph_node is None:
+            raise Exception(f'Node ID:{node_id} not found')
+        return graph_node
 
-    @cached(cache={}, key=lambda self: hashkey(self.graph))
     def get_entry_node(self):
         if len(self.graph.graph_nodes) == 0:
             return None
@@ -95,3 +182,60 @@ class GraphParser:
                 return _graph_node.graph_node
 
         return self.graph.graph_nodes[0]
+
+    def compile(self):
+        """
+        Parse every graph node once and link the successors of each other.
+        """
+        graph_nodes = [self.parse_graph_node(graph_node) for graph_node in self.graph.graph_nodes]
+        plan_nodes = {}
+        for graph_node in graph_nodes:
+            plan_nodes.setdefault(graph_node.id, PlanNode(graph_node))
+
+        def resolve(_graph_node):
+            return plan_nodes[_graph_node['id']] if _graph_node else None
+
+        for plan_node in plan_nodes.values():
+            graph_node = plan_node.graph_node
+            if plan_node.branching:
+                plan_node.positive_next = resolve(graph_node.positive_next)
+                plan_node.negative_next = resolve(graph_node.negative_next)
+            else:
+                plan_node.next = resolve(graph_node.next)
+            if issubclass(plan_node.cls, ParallelNode):
+                plan_node.branches = self.compile_branches(graph_node.graph_node.get('branches', None))
+
+        entry = None
+        if graph_nodes:
+            entry = next((plan_nodes[graph_node.id] for graph_node in graph_nodes
+                          if graph_node.cls.kind == StartNode.kind), plan_nodes[graph_nodes[0].id])
+        return GraphPlan(self.graph, plan_nodes.values(), entry)
+
+    @staticmethod
+    def compile_branches(branches):
+        """
+        compile the branches of a parallel node, a dict of {name: graph nodes} or a list of graph nodes.
+        """
+        if not branches:
+            raise Exception('Invalid Parallel Node,it must includes branches')
+        if not isinstance(branches, dict):
+            branches = dict(enumerate(branches))
+
+        plans = {}
+        for name, graph_nodes in branches.items():
+            graph = Graph()
+            graph.graph_nodes = graph_nodes
+            plans[name] = GraphParser(graph).compile()
+        return MappingProxyType(plans)
+
+
+def get_plan(flow):
+    """
+    Returns the plan of a flow, it is compiled on first use and kept on the flow class.
+    """
+    flow_cls = flow.__class__
+    plan = flow_cls.__dict__.get('_graph_plan')
+    if plan is None:
+        plan = GraphParser(flow.create_graph()).compile()
+        setattr(flow_cls, '_graph_plan', plan)
+    return plan
@@ -0,0 +1,172 @@
+"""
+Structured flow logging.
+
+When `flow.debug` is True, the run of the flow is written as one JSON line by a background thread.
+Configured by `settings.ARKFBP_FLOW_LOG`:
+
+    ARKFBP_FLOW_LOG = {
+        'sample_rate': 1.0,     # part of the runs written, runs ending by an error are always written
+        'max_repr': 512,        # max length of the repr of inputs and outputs
+        'queue_size': 10000,    # records waiting for the writer, new records are dropped when it is full
+        'path': None,           # file appended to, stdout by default
+    }
+"""
+import atexit
+import json
+import queue
+import random
+import reprlib
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from .state import NodeRecord
+
+DEFAULT_CONFIG = {
+    'sample_rate': 1.0,
+    'max_repr': 512,
+    'queue_size': 10000,
+    'path': None,
+}
+
+
+def get_config():
+    """
+    settings.ARKFBP_FLOW_LOG over the default config.
+    """
+    config = getattr(settings, 'ARKFBP_FLOW_LOG', None) if settings.configured else None
+    return {**DEFAULT_CONFIG, **(config or {})}
+
+
+class ShortRepr(reprlib.Repr):
+    """
+    repr limited to a number of characters.
+    """
+    def __init__(self, max_repr):
+        super().__init__()
+        self.max_repr = max_repr
+        self.maxstring = max_repr
+        self.maxother = max_repr
+        self.maxlong = max_repr
+
+    def repr(self, x):
+        text = super().repr(x)
+        if len(text) > self.max_repr:
+            text = text[:self.max_repr - 3] + '...'
+        return text
+
+
+class FlowLogWriter:
+    """
+    Writes records as JSON lines from a bounded queue in a daemon thread,
+    so the flow never waits for the output.
+    """
+    def __init__(self, stream=None, path=None, queue_size=10000):
+        self.stream = stream
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def write(self, record):
+        """
+        queue a record, it is dropped when the queue is full.
+        """
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='arkfbp-flow-log', daemon=True)
+                self._thread.start()
+
+    def _open(self):
+        if self.path:
+            return open(self.path, 'a', encoding='utf8')
+        return self.stream or sys.stdout
+
+    def _run(self):
+        stream = self._open()
+        while True:
+            record = self.queue.get()
+            if record is None:
+                stream.flush()
+                self.queue.task_done()
+                continue
+            try:
+                stream.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                if self.queue.empty():
+                    stream.flush()
+            # pylint: disable=broad-except
+            except Exception:
+                self.dropped += 1
+            self.queue.task_done()
+
+    def flush(self, timeout=1.0):
+        """
+        wait, at most `timeout` seconds, for the queued records to be written.
+        """
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_writer():
+    """
+    the process wide writer.
+    """
+    global _WRITER    # pylint: disable=global-statement
+    if _WRITER is None:
+        with _WRITER_LOCK:
+            if _WRITER is None:
+                config = get_config()
+                _WRITER = FlowLogWriter(path=config['path'], queue_size=config['queue_size'])
+                atexit.register(_WRITER.flush)
+    return _WRITER
+
+
+def log_flow(flow, error=None):
+    """
+    write a sampled record of the nodes run by the flow.
+    """
+    config = get_config()
+    sample_rate = flow.log_sample_rate if flow.log_sample_rate is not None else config['sample_rate']
+    if error is None and random.random() >= sample_rate:
+        return
+
+    short_repr = ShortRepr(config['max_repr']).repr
+    nodes = []
+    for node in flow.state.nodes:
+        cls = node.cls if isinstance(node, NodeRecord) else node.__class__
+        nodes.append({
+            'id': getattr(node, 'id', None),
+            'kind': getattr(node, 'kind', None),
+            'class': f'{cls.__module__}.{cls.__qualname__}',
+            'inputs': short_repr(getattr(node, 'inputs', None)),
+            'outputs': short_repr(getattr(node, 'outputs', None)),
+        })
+    get_writer().write({
+        'time': time.time(),
+        'flow': str(flow),
+        'status': flow.status,
+        'error': short_repr(error) if error is not None else None,
+        'nodes': nodes,
+    })
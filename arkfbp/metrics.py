@@ -0,0 +1,221 @@
+"""
+Timing and counters of flows and nodes.
+
+Enabled for a flow class by `metrics = True`, or for every flow by `settings.ARKFBP_METRICS = True`.
+Measurements go to a sink, the in-process `registry` by default, another one can be set by
+`settings.ARKFBP_METRICS_SINK = 'path.to.SinkClass'` or `set_sink()`. A sink implements:
+
+    record_node(flow_name, node_id, wall_time, cpu_time)
+    record_flow(flow_name, wall_time, cpu_time, status)
+
+CPU time is the time of the thread running the flow or the node. It is None when they are measured
+in the thread of an event loop, which runs the other coroutines as well: flows of the async engine report no CPU time.
+"""
+import asyncio
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .utils.util import get_class_from_path
+
+# upper bounds in seconds of the histogram buckets
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+           float('inf'))
+
+
+class Histogram:
+    """
+    Histogram of durations with fixed buckets.
+    """
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """
+        add a duration.
+        """
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, quantile):
+        """
+        upper bound of the bucket holding the quantile.
+        """
+        rank = quantile * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return 0.0
+
+    def to_dict(self):
+        """
+        summary of the histogram.
+        """
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip(BUCKETS, self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """
+    In-process sink aggregating the measurements into histograms.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        drop every measurement.
+        """
+        with self._lock:
+            self._nodes = defaultdict(lambda: (Histogram(), Histogram()))
+            self._flows = defaultdict(lambda: (Histogram(), Histogram()))
+            self._statuses = defaultdict(lambda: defaultdict(int))
+
+    def record_node(self, flow_name, node_id, wall_time, cpu_time):
+        """
+        record one run of a node.
+        """
+        with self._lock:
+            wall, cpu = self._nodes[(flow_name, node_id)]
+            wall.observe(wall_time)
+            if cpu_time is not None:
+                cpu.observe(cpu_time)
+
+    def record_flow(self, flow_name, wall_time, cpu_time, status):
+        """
+        record one run of a flow and how it ended.
+        """
+        with self._lock:
+            wall, cpu = self._flows[flow_name]
+            wall.observe(wall_time)
+            if cpu_time is not None:
+                cpu.observe(cpu_time)
+            self._statuses[flow_name][status] += 1
+
+    def snapshot(self):
+        """
+        {flow name: {'wall': ..., 'cpu': ..., 'statuses': {...}, 'nodes': {node id: {'wall': ..., 'cpu': ...}}}}
+        """
+        with self._lock:
+            flows = {}
+            for flow_name, (wall, cpu) in self._flows.items():
+                flows[flow_name] = {
+                    'wall': wall.to_dict(),
+                    'cpu': cpu.to_dict(),
+                    'statuses': dict(self._statuses[flow_name]),
+                    'nodes': {},
+                }
+            for (flow_name, node_id), (wall, cpu) in self._nodes.items():
+                flow = flows.setdefault(flow_name, {'nodes': {}})
+                flow['nodes'][node_id] = {'wall': wall.to_dict(), 'cpu': cpu.to_dict()}
+            return flows
+
+
+registry = MetricsRegistry()
+_SINK = None
+
+
+def get_sink():
+    """
+    the sink receiving the measurements.
+    """
+    global _SINK    # pylint: disable=global-statement
+    if _SINK is None:
+        path = getattr(settings, 'ARKFBP_METRICS_SINK', None) if settings.configured else None
+        _SINK = get_class_from_path(path)() if path else registry
+    return _SINK
+
+
+def set_sink(sink):
+    """
+    replace the sink, None restores the configured one.
+    """
+    global _SINK    # pylint: disable=global-statement
+    _SINK = sink
+
+
+def enabled(flow):
+    """
+    whether the flow is measured.
+    """
+    if flow.metrics is not None:
+        return flow.metrics
+    return getattr(settings, 'ARKFBP_METRICS', False) if settings.configured else False
+
+
+def thread_time():
+    """
+    CPU time of the calling thread, None in the thread of a running event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return time.thread_time()
+    return None
+
+
+def start(cpu=True):
+    """
+    the starting point of a measurement, cpu is False when the thread runs other work until it ends.
+    """
+    return time.perf_counter(), thread_time() if cpu else None
+
+
+def elapsed(started):
+    """
+    (wall time, cpu time) since the starting point, cpu time is None when it was not measured.
+    """
+    cpu_time = time.thread_time() - started[1] if started[1] is not None else None
+    return time.perf_counter() - started[0], cpu_time
+
+
+def record_flow(flow, started):
+    """
+    record a flow which started at `started`.
+    """
+    wall_time, cpu_time = elapsed(started)
+    get_sink().record_flow(flow.metrics_name, wall_time, cpu_time, flow.status)
+
+
+class NodeTimer:
+    """
+    Plan observer measuring every node.
+    """
+    # pylint: disable=unused-argument, no-self-use
+    def before_node(self, flow, plan_node):
+        """
+        called before a node runs, returns the starting point passed to `after_node`.
+        """
+        return start()
+
+    def after_node(self, flow, plan_node, outputs, started):
+        """
+        called after a node runs.
+        """
+        wall_time, cpu_time = elapsed(started)
+        get_sink().record_node(flow.metrics_name, plan_node.id, wall_time, cpu_time)
+
+
+NODE_TIMER = NodeTimer()
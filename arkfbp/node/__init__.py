@@ -1,10 +1,13 @@
 # pylint: disable=missing-module-docstring
 from .api_node import APINode
 from .base import Node
-from .function_node import FunctionNode
+from .fan_out_api_node import FanOutAPINode
+from .function_node import FunctionNode, cpu_bound
 from .if_node import IFNode
 from .loop_node import LoopNode
+from .map_node import MapNode
 from .nop_node import NopNode
+from .parallel_node import ParallelNode
 from .start_node import StartNode
 from .stop_node import StopNode
 from .test_node import TestNode
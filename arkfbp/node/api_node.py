@@ -1,6 +1,9 @@
 import requests
+from django.conf import settings
 
 from .base import Node
+from .. import transport
+from ..deadline import DeadlineExceeded
 
 # api mode for requests
 DIRECT_MODE = 'direct'
@@ -30,6 +33,17 @@ class APINode(Node):
     params = None
     json = True
     files = None
+    # seconds to wait for the upstream, None follows the session profile then `settings.ARKFBP_API_TIMEOUT`,
+    # it is shortened to the time left before the deadline of the flow
+    timeout = None
+    # profile of `settings.ARKFBP_HTTP` the pooled session is created with, see `arkfbp.transport`
+    session_profile = None
+    # GET responses are cached by their HTTP headers, see `arkfbp.transport.http_cache`
+    http_cache = False
+    # seconds a stale cached response is returned while it is revalidated, None follows the response and the config
+    stale_while_revalidate = None
+    # identical concurrent GETs of the process share one upstream call, see `arkfbp.transport.single_flight`
+    coalesce = False
 
     def __init__(self, *args, **kwargs):
         super(Node).__init__(*args, **kwargs)
@@ -49,7 +63,6 @@ class APINode(Node):
         return exec(f'self.{name}')
 
     def _init_request_kwargs(self):
-        kwargs = {}
         self.url = self._get_request_attr('url')
         self.auth = self._get_request_attr('auth')
         self.method = self._get_request_attr('method').upper()
@@ -59,47 +72,137 @@ class APINode(Node):
         self.headers = self._get_request_attr('headers')
         self.files = self._get_request_attr('files')
 
-        if self.auth is not None:
-            kwargs['auth'] = self.auth
+        return self.build_request_kwargs(self.method,
+                                         auth=self.auth,
+                                         params=self.params,
+                                         headers=self.headers,
+                                         files=self.files,
+                                         json=self.json,
+                                         timeout=self.get_timeout())
+
+    @staticmethod
+    def build_request_kwargs(method, auth=None, params=None, headers=None, files=None, json=True, timeout=None):
+        """
+        keyword arguments of `requests` for a call, the params are the query of a GET and the body otherwise.
+        """
+        kwargs = {}
+        if auth is not None:
+            kwargs['auth'] = auth
 
-        if self.params is not None:
-            if self.method == GET_METHOD:
-                kwargs['params'] = self.params
+        if params is not None:
+            if method == GET_METHOD:
+                kwargs['params'] = params
             else:
-                if self.json is True:
-                    kwargs['json'] = self.params
+                if json is True:
+                    kwargs['json'] = params
                 else:
-                    kwargs['data'] = self.params
+                    kwargs['data'] = params
+
+        if headers is not None:
+            kwargs['headers'] = headers
 
-        if self.headers is not None:
-            kwargs['headers'] = self.headers
+        if files is not None:
+            kwargs['files'] = files
 
-        if self.files is not None:
-            kwargs['files'] = self.files
+        if timeout is not None:
+            kwargs['timeout'] = timeout
 
         return kwargs
 
+    def get_timeout(self, timeout=None):
+        """
+        timeout of the request, the earliest of the node timeout and the deadline of the flow.
+        a timeout given overrides the one of the node.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if timeout is None:
+            timeout = transport.get_timeout(self.session_profile)
+        if timeout is None:
+            timeout = getattr(settings, 'ARKFBP_API_TIMEOUT', None) if settings.configured else None
+        remaining = self.flow.remaining_time() if self.flow is not None else None
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded(f'No time left to request {self.url}')
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def get_session(self):
+        """
+        the pooled keep-alive session of the upstream.
+        """
+        return transport.get_session(self.url, self.session_profile)
+
+    def send(self, method, url, request_kwargs):
+        """
+        send a request by the pooled session, a GET goes through the HTTP cache when it is enabled
+        and is coalesced with the identical GETs in flight when `coalesce` is set.
+        """
+        try:
+            if self.coalesce and method == GET_METHOD:
+                key = transport.single_flight.make_key(method, url, request_kwargs, self.session_profile)
+                return transport.SINGLE_FLIGHT.do(key, lambda: self._send(method, url, request_kwargs),
+                                                  host=transport.get_host(url), timeout=request_kwargs.get('timeout'))
+            return self._send(method, url, request_kwargs)
+        except requests.RequestException as exception:
+            self.raise_deadline_exceeded(url, exception)
+            raise
+
+    def raise_deadline_exceeded(self, url, exception):
+        """
+        a request failing once the deadline of the flow expired, its timeout being shortened to the time left,
+        raises `DeadlineExceeded`.
+        """
+        remaining = self.flow.remaining_time() if self.flow is not None else None
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f'The deadline expired while requesting {url}') from exception
+
+    def _send(self, method, url, request_kwargs):
+        session = transport.get_session(url, self.session_profile)
+        if self.http_cache and method == GET_METHOD:
+            return transport.get_http_cache().request(session, url, request_kwargs, self.stale_while_revalidate,
+                                                      self.session_profile)
+        return session.request(method, url, **request_kwargs)
+
     def _request_direct(self):
-        response = None
         kwargs = self._init_request_kwargs()
-
-        if self.method == GET_METHOD:
-            response = requests.get(self.url, **kwargs)
-
-        if self.method == POST_METHOD:
-            response = requests.post(self.url, **kwargs)
-
-        if self.method == PUT_METHOD:
-            response = requests.put(self.url, **kwargs)
-
-        if self.method == PATCH_METHOD:
-            response = requests.patch(self.url, **kwargs)
-
-        if self.method == DELETE_METHOD:
-            response = requests.delete(self.url, **kwargs)
-
+        response = self.send(self.method, self.url, kwargs)
         response_content = response.content.decode()
         return response_content
 
+    def get_proxy_url(self, request):
+        """
+        the upstream of a proxied request, `url` with the query of the request.
+        """
+        query = request.META.get('QUERY_STRING')
+        if not query:
+            return self.url
+        return f'{self.url}&{query}' if '?' in self.url else f'{self.url}?{query}'
+
     def _request_proxy(self):
-        return None
+        """
+        forward the django request of the flow and stream the upstream response back, the bodies are never buffered.
+        """
+        request = self.flow.request
+        self.url = self._get_request_attr('url')
+        self.auth = self._get_request_attr('auth')
+        self.headers = self._get_request_attr('headers')
+        url = self.get_proxy_url(request)
+        headers = {**transport.proxy.request_headers(request), **(self.headers or {})}
+        kwargs = {'headers': headers, 'stream': True, 'allow_redirects': False}
+        body = transport.proxy.request_body(request)
+        if body is not None:
+            kwargs['data'] = body
+        if self.auth is not None:
+            kwargs['auth'] = self.auth
+        timeout = self.get_timeout()
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        try:
+            upstream = transport.get_session(url, self.session_profile).request(request.method, url, **kwargs)
+        except requests.RequestException as exception:
+            self.raise_deadline_exceeded(url, exception)
+            raise
+        response = transport.proxy.streaming_response(upstream)
+        self.flow.proxy_responses.append(response)
+        return response
@@ -1,23 +1,74 @@
 from abc import abstractmethod
+from inspect import iscoroutinefunction
+
+from ..utils.util import overridden_methods
 
 # Node metadata
 _NODE_ID = ''
 _NODE_NAME = 'base'
 _NODE_KIND = 'base'
 
+# Node lifecycle hooks, grouped by the step of `Executer.start_node` running them
+BEFORE_INIT_HOOKS = ('created', 'before_initialize', 'init')
+BEFORE_RUN_HOOKS = ('initialized', 'before_execute')
+AFTER_RUN_HOOKS = ('executed', )
+
 
 class Node:
-    id = _NODE_ID
+    """
+    base node.
+    The attributes set by the executer are slots, a subclass declaring `__slots__` for its own
+    attributes (`__slots__ = ()` when it has none) is compact, its instances have no `__dict__`.
+    """
+    __slots__ = ('_id', '_state', '_flow', '_inputs', '_outputs', 'flows')
+
     name = _NODE_NAME
     kind = _NODE_KIND
     next = None
     error_next = None
 
+    # lifecycle hooks overridden by the node class, only these are called by the executer
+    before_init_hooks = ()
+    before_run_hooks = ()
+    after_run_hooks = ()
+    # whether `run`, `run_async` or any overridden hook is a coroutine function,
+    # the async engine awaits `run_async` instead of `run` when a node defines it.
+    asynchronous = False
+    # the async engine runs sync nodes in a thread pool unless they can not block,
+    # a subclass defining `run` or a lifecycle hook blocks again unless it sets `blocking` itself
+    blocking = True
+    # `run` of a cpu bound node is executed in the process pool
+    cpu_bound = False
+    # `arkfbp.cache.CachePolicy` memoizing the outputs of `run` by `cache_key`
+    cache_policy = None
+    # a checkpoint can be saved after the node, see `arkfbp.checkpoint`
+    resumable = True
+    # instances are kept by the plan and reused by the next runs, the node must not keep
+    # anything between runs besides what `reset` clears
+    reusable = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.before_init_hooks = overridden_methods(cls, Node, BEFORE_INIT_HOOKS)
+        cls.before_run_hooks = overridden_methods(cls, Node, BEFORE_RUN_HOOKS)
+        cls.after_run_hooks = overridden_methods(cls, Node, AFTER_RUN_HOOKS)
+        hooks = ('run', 'run_async') + cls.before_init_hooks + cls.before_run_hooks + cls.after_run_hooks
+        cls.asynchronous = any(iscoroutinefunction(getattr(cls, hook, None)) for hook in hooks)
+        own_hooks = ('run', ) + BEFORE_INIT_HOOKS + BEFORE_RUN_HOOKS + AFTER_RUN_HOOKS
+        if 'blocking' not in cls.__dict__ and any(hook in cls.__dict__ for hook in own_hooks):
+            cls.blocking = True
+
+    def __new__(cls, *args, **kwargs):
+        node = super().__new__(cls)
+        # a node class may declare its id
+        node._id = cls.id if isinstance(cls.id, str) else _NODE_ID
+        node._state = node._flow = node._inputs = node._outputs = None
+        # the flows of a batch aware node, see `Executer.start_flows`
+        node.flows = None
+        return node
+
     def __init__(self, *args, **kwargs):
-        self._state = None
-        self._inputs = None
-        self._outputs = None
-        self._flow = None
+        pass
 
     def __str__(self):
         return f'Node: {self.id}:({self.name}:{self.kind})'
@@ -31,6 +82,19 @@ class Node:
         """
         self.state = cb(self.state)
 
+    @abstractmethod
+    def run(self, *args, **kwargs):
+        """run a node"""
+        raise NotImplementedError
+
+    @property
+    def id(self):
+        return self._id
+
+    @id.setter
+    def id(self, node_id):
+        self._id = node_id
+
     @property
     def state(self):
         return self._state
@@ -47,10 +111,13 @@ class Node:
     def flow(self, flow):
         self._flow = flow
 
-    @abstractmethod
-    def run(self, *args, **kwargs):
-        """run a node"""
-        raise NotImplementedError
+    @property
+    def inputs(self):
+        return self._inputs
+
+    @inputs.setter
+    def inputs(self, inputs):
+        self._inputs = inputs
 
     @property
     def outputs(self):
@@ -60,13 +127,17 @@ class Node:
     def outputs(self, outputs):
         self._outputs = outputs
 
-    @property
-    def inputs(self):
-        return self._inputs
+    def reset(self):
+        """clear what a run set on the node, before a reusable node is used again"""
+        self._state = None
+        self._flow = None
+        self._inputs = None
+        self._outputs = None
+        self.flows = None
 
-    @inputs.setter
-    def inputs(self, inputs):
-        self._inputs = inputs
+    def cache_key(self):
+        """key of the outputs under the cache policy, None skips the cache"""
+        return None
 
     def on_completed(self, *args, **kwargs):
         """overridden by user"""
@@ -0,0 +1,176 @@
+"""
+Fan Out API Node.
+"""
+import asyncio
+import threading
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .api_node import APINode, REQUEST_METHOD
+from .. import transport
+from ..deadline import DeadlineExceeded
+
+# FanOutAPINode metadata
+_NODE_NAME = 'fan_out_api'
+_NODE_KIND = 'fan_out_api'
+
+# result of one call, `error` is the exception raised by the call, None when it got a response
+APIResult = namedtuple('APIResult', ['status', 'content', 'error'])
+
+# attributes of the node a call defaults to, read through their `set_*` hooks
+REQUEST_ATTRS = ('url', 'method', 'auth', 'params', 'headers', 'files')
+
+_LOCK = threading.Lock()
+_POOL = None
+
+
+def get_pool():
+    """
+    the threads of the calls, sized by `settings.ARKFBP_FAN_OUT_POOL_SIZE`.
+    they only wait for sockets, a pool of their own never waits for the pool running the flow.
+    """
+    global _POOL    # pylint: disable=global-statement
+    if _POOL is None:
+        with _LOCK:
+            if _POOL is None:
+                max_workers = getattr(settings, 'ARKFBP_FAN_OUT_POOL_SIZE', 32) if settings.configured else 32
+                _POOL = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='arkfbp-fan-out')
+    return _POOL
+
+
+class FanOutAPINode(APINode):
+    """
+    API node running many calls concurrently, the outputs are their `APIResult` in the order of the calls.
+    Every call is a url or a dict over the attributes of the node:
+
+        {'url': ..., 'method': 'GET', 'params': ..., 'headers': ..., 'auth': ..., 'files': ..., 'timeout': ...}
+
+    The calls are `inputs` unless `get_calls` is overridden. At most `max_per_host` calls run at once
+    against the same host, `max_concurrency` in total. A call which can not start before the deadline of the flow
+    gets a `DeadlineExceeded` error, the running ones are bounded by the time left.
+    """
+    name = _NODE_NAME
+    kind = _NODE_KIND
+    max_per_host = 4
+    max_concurrency = 16
+
+    def get_calls(self):
+        """
+        the calls of the node, `inputs` by default.
+        """
+        return self.inputs
+
+    def run(self, *args, **kwargs):
+        defaults = self.get_call_defaults()
+        calls = [self.get_call(call, defaults) for call in self.get_calls()]
+        results = [None] * len(calls)
+        pool = get_pool()
+        hosts = OrderedDict()
+        for index, call in enumerate(calls):
+            hosts.setdefault(transport.get_origin(call['url']), deque()).append(index)
+        running = {}
+        per_host = dict.fromkeys(hosts, 0)
+
+        while hosts or running:
+            for host in list(hosts):
+                waiting = hosts[host]
+                while waiting and per_host[host] < self.max_per_host and len(running) < self.max_concurrency:
+                    index = waiting.popleft()
+                    try:
+                        request_kwargs = self.get_call_kwargs(calls[index])
+                    except DeadlineExceeded as exception:
+                        results[index] = APIResult(None, None, exception)
+                        continue
+                    future = pool.submit(self.request, calls[index], request_kwargs)
+                    running[future] = (host, index)
+                    per_host[host] += 1
+                if not waiting:
+                    del hosts[host]
+            if not running:
+                continue
+
+            done, _ = wait(running, timeout=self.flow.remaining_time() if self.flow else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                # the deadline passed, the running calls are left to their own timeout
+                late = [index for _, index in running.values()]
+                for index in late + [index for waiting in hosts.values() for index in waiting]:
+                    results[index] = APIResult(None, None, DeadlineExceeded('The call did not end before the deadline'))
+                break
+            for future in done:
+                host, index = running.pop(future)
+                per_host[host] -= 1
+                results[index] = future.result()
+        return results
+
+    async def run_async(self, *args, **kwargs):
+        """
+        run the calls as tasks under the async engine.
+        """
+        defaults = self.get_call_defaults()
+        calls = [self.get_call(call, defaults) for call in self.get_calls()]
+        loop = asyncio.get_running_loop()
+        pool = get_pool()
+        total = asyncio.Semaphore(self.max_concurrency)
+        per_host = {}
+        for call in calls:
+            per_host.setdefault(transport.get_origin(call['url']), asyncio.Semaphore(self.max_per_host))
+
+        async def run_call(call):
+            async with per_host[transport.get_origin(call['url'])], total:
+                try:
+                    request_kwargs = self.get_call_kwargs(call)
+                except DeadlineExceeded as exception:
+                    return APIResult(None, None, exception)
+                future = loop.run_in_executor(pool, self.request, call, request_kwargs)
+                try:
+                    return await asyncio.wait_for(future, self.flow.remaining_time() if self.flow else None)
+                except asyncio.TimeoutError:
+                    return APIResult(None, None, DeadlineExceeded('The call did not end before the deadline'))
+
+        return list(await asyncio.gather(*[run_call(call) for call in calls]))
+
+    def get_call_defaults(self):
+        """
+        the request attributes of the node, through the `set_*` hooks as `APINode` reads them.
+        """
+        defaults = {name: self._get_request_attr(name) for name in REQUEST_ATTRS}
+        defaults.update({'json': self.json, 'timeout': None})
+        return defaults
+
+    def get_call(self, call, defaults=None):
+        """
+        a call over the request attributes of the node, `get_call_defaults()` unless defaults are given.
+        """
+        if isinstance(call, str):
+            call = {'url': call}
+        call = {**(defaults if defaults is not None else self.get_call_defaults()), **call}
+        call['method'] = call['method'].upper()
+        if call['method'] not in REQUEST_METHOD:
+            raise Exception(f'Unknown request method,Please choose one in {REQUEST_METHOD}')
+        return call
+
+    def get_call_kwargs(self, call):
+        """
+        keyword arguments of `requests` for the call, the timeout is the time left when the call starts.
+        """
+        return self.build_request_kwargs(call['method'],
+                                         auth=call['auth'],
+                                         params=call['params'],
+                                         headers=call['headers'],
+                                         files=call['files'],
+                                         json=call['json'],
+                                         timeout=self.get_timeout(call['timeout']))
+
+    def request(self, call, request_kwargs):
+        """
+        send one call, the errors are returned in its result.
+        """
+        try:
+            response = self.send(call['method'], call['url'], request_kwargs)
+            return APIResult(response.status_code, response.content.decode(), None)
+        # pylint: disable=broad-except
+        except Exception as exception:
+            return APIResult(None, None, exception)
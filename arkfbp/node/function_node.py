@@ -6,8 +6,18 @@ _NODE_KIND = 'function'
 
 
 class FunctionNode(Node):
+    __slots__ = ()
     name = _NODE_NAME
     kind = _NODE_KIND
 
     def run(self, *args, **kwargs):
         return None
+
+
+def cpu_bound(node_cls):
+    """
+    Mark a node class as cpu bound, its `run` is executed in the process pool
+    with copies of its inputs and the flow state, so it does not hold the GIL of the workers.
+    """
+    node_cls.cpu_bound = True
+    return node_cls
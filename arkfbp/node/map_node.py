@@ -0,0 +1,122 @@
+"""
+Map Node.
+"""
+import contextvars
+from collections import deque
+from itertools import islice
+
+from django.db import models
+
+from .base import Node
+from ..utils.concurrency import get_thread_pool, in_worker_thread
+
+# MapNode metadata
+_NODE_NAME = 'map'
+_NODE_KIND = 'map'
+
+
+class MapNode(Node):
+    """
+    Lazy map over a data source, in chunks.
+
+    `source()` returns an iterable, a queryset is read `chunk_size` rows at a time by `.iterator()`.
+    Every chunk goes through `process_chunk`, which calls `process_item` for each item by default.
+    The outputs are a generator, the next node consumes them while the source is read:
+
+        class Export(MapNode):
+            chunk_size = 500
+
+            def source(self):
+                return User.objects.order_by('id')
+
+            def process_item(self, item):
+                return {'id': item.id, 'name': item.username}
+
+    With `workers`, up to `workers` chunks are processed at once by the thread pool,
+    the outputs keep the order of the source. A map consumed in a thread of the pool processes them in that thread.
+    The map ends early when the flow is shutdown or terminated while it is consumed.
+    """
+    name = _NODE_NAME
+    kind = _NODE_KIND
+    chunk_size = 1000
+    # chunks processed at once in the thread pool, 0 processes them in the consuming thread
+    workers = 0
+
+    def source(self):
+        """
+        the iterable mapped, the inputs by default.
+        """
+        return self.inputs
+
+    def process_item(self, item):
+        """
+        overridden by user.
+        """
+        return item
+
+    def process_chunk(self, chunk):
+        """
+        outputs of a chunk, a list of items.
+        """
+        return [self.process_item(item) for item in chunk]
+
+    def chunks(self):
+        """
+        the source, a list of at most `chunk_size` items at a time.
+        """
+        source = self.source()
+        if isinstance(source, models.Manager):
+            source = source.all()
+        if isinstance(source, models.QuerySet):
+            source = source.iterator(chunk_size=self.chunk_size)
+        iterator = iter(source)
+        chunk = list(islice(iterator, self.chunk_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(iterator, self.chunk_size))
+
+    def aborted(self):
+        """
+        whether the flow was shutdown or terminated, a flow which stopped normally still consumes the map.
+        """
+        # pylint: disable=import-outside-toplevel
+        from ..flow.base import FLOW_ERROR, FLOW_FROZEN
+        return self.flow.valid_status(FLOW_ERROR) or self.flow.valid_status(FLOW_FROZEN)
+
+    def run(self, *args, **kwargs):
+        return self.map_parallel() if self.workers > 0 else self.map()
+
+    def map(self):
+        """
+        process the chunks one after another.
+        """
+        for chunk in self.chunks():
+            if self.aborted():
+                return
+            yield from self.process_chunk(chunk)
+
+    def map_parallel(self):
+        """
+        process up to `workers` chunks at once.
+        consumed in a thread of the pool, e.g. in a branch of a parallel node, the chunks are processed one after
+        another: waiting for the pool it is running in could deadlock it.
+        """
+        if in_worker_thread():
+            yield from self.map()
+            return
+        pool = get_thread_pool()
+        pending = deque()
+        try:
+            for chunk in self.chunks():
+                if self.aborted():
+                    return
+                pending.append(pool.submit(contextvars.copy_context().run, self.process_chunk, chunk))
+                if len(pending) >= self.workers:
+                    yield from pending.popleft().result()
+            while pending:
+                if self.aborted():
+                    return
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -6,8 +6,10 @@ _NODE_KIND = 'nop'
 
 
 class NopNode(Node):
+    __slots__ = ()
     name = _NODE_NAME
     kind = _NODE_KIND
+    blocking = False
 
     def run(self, *args, **kwargs):
         return None
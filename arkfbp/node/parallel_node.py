@@ -0,0 +1,146 @@
+"""
+Parallel Node.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .base import Node
+from ..executer import Executer
+from ..utils.concurrency import get_thread_pool, in_worker_thread
+
+# ParallelNode metadata
+_NODE_NAME = 'parallel'
+_NODE_KIND = 'parallel'
+
+
+class ParallelNode(Node):
+    """
+    Fork/join node.
+    Its graph node lists the branches, each one is a list of graph nodes like `create_nodes`:
+
+        {
+            'cls': ParallelNode,
+            'id': 'fetch',
+            'branches': {
+                'user': [{'cls': UserNode, 'id': 'user'}],
+                'orders': [{'cls': OrdersNode, 'id': 'orders'}],
+            },
+            'next': 'stop',
+        }
+
+    Every branch starts with the inputs of the node and runs with its own deep copy of the flow state data,
+    the outputs are {branch name: branch outputs}. When a branch raises or shutdowns the flow,
+    the others are cancelled and their outputs ignored, the first aborted branch in declaration
+    order decides the result of the node.
+    """
+    name = _NODE_NAME
+    kind = _NODE_KIND
+
+    def run(self, *args, **kwargs):
+        # pylint: disable=import-outside-toplevel
+        from ..flow.branch_flow import BranchFlow
+        cancelled = threading.Event()
+        branches = [
+            BranchFlow(self.flow, plan, self.inputs, cancelled) for plan in self.get_branch_plans().values()
+        ]
+        finished = []
+        # a nested parallel node must not wait for the pool it is running in
+        if in_worker_thread() or len(branches) < 2:
+            for branch in branches:
+                finished.append(self.run_branch(branch, *args, **kwargs))
+                if branch.aborted:
+                    break
+        else:
+            pool = get_thread_pool()
+            # every branch runs in a copy of the context, so nested flows inherit the deadline
+            pending = {
+                pool.submit(contextvars.copy_context().run, self.run_branch, branch, *args, **kwargs)
+                for branch in branches
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                finished += [future.result() for future in done]
+                if any(branch.aborted for branch in finished):
+                    cancelled.set()
+                    for future in pending:
+                        future.cancel()
+                    break
+        return self.join(branches, finished)
+
+    async def run_async(self, *args, **kwargs):
+        """
+        run the branches as tasks under the async engine.
+        """
+        # pylint: disable=import-outside-toplevel
+        from ..flow.branch_flow import BranchFlow
+        cancelled = threading.Event()
+        branches = [
+            BranchFlow(self.flow, plan, self.inputs, cancelled) for plan in self.get_branch_plans().values()
+        ]
+        finished = []
+        pending = {asyncio.ensure_future(self.run_branch_async(branch, *args, **kwargs)) for branch in branches}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            finished += [task.result() for task in done]
+            if any(branch.aborted for branch in finished):
+                cancelled.set()
+                for task in pending:
+                    task.cancel()
+                break
+        return self.join(branches, finished)
+
+    def get_branch_plans(self):
+        """
+        the compiled branches of this node, {branch name: plan}.
+        """
+        plan_node = self.flow.plan.get(self.id)
+        if plan_node is None or plan_node.branches is None:
+            raise Exception(f'ParallelNode:{self.id} has no branches in the graph')
+        return plan_node.branches
+
+    @staticmethod
+    def run_branch(branch, *args, **kwargs):
+        """
+        run one branch to its end.
+        """
+        try:
+            Executer.run_plan(branch.plan, branch, *args, **kwargs)
+        # pylint: disable=broad-except
+        except Exception as exception:
+            branch.terminate(exception)
+        return branch
+
+    @staticmethod
+    async def run_branch_async(branch, *args, **kwargs):
+        """
+        run one branch to its end under the async engine.
+        """
+        try:
+            await Executer.run_plan_async(branch.plan, branch, *args, **kwargs)
+        # pylint: disable=broad-except
+        except Exception as exception:
+            branch.terminate(exception)
+        return branch
+
+    def join(self, branches, finished):
+        """
+        join the branches, the first finished branch which aborted,
+        in declaration order, raises its error or shutdowns the flow.
+        """
+        for branch in branches:
+            if branch not in finished or not branch.aborted:
+                continue
+            if branch.error is not None:
+                raise branch.error
+            return self.flow.shutdown(branch.outputs, **branch.shutdown_kwargs)
+        names = self.get_branch_plans().keys()
+        return self.merge(dict(zip(names, [branch.outputs for branch in branches])))
+
+    # pylint: disable=no-self-use
+    def merge(self, outputs):
+        """
+        merge the outputs of all branches, {branch name: branch outputs} by default.
+        """
+        return outputs
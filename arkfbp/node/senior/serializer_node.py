@@ -187,21 +187,37 @@ class ListSerializerNode(SerializerNode):
     kind = _LIST_SERIALIZER_NODE_KIND
     child = None
     many = True
+    # `to_representation` returns a generator, a queryset is fetched `chunk_size` rows at a time
+    stream = False
+    chunk_size = 2000
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.child = kwargs.pop('child', copy.deepcopy(self.child))
+        self.stream = kwargs.pop('stream', self.stream)
         assert self.child is not None, '`child` is a required argument in ListSerializerNode.'
 
     def to_representation(self, instance):
         """
         List of object instances -> List of dicts of primitive data types.
         """
+        if self.stream:
+            return self.iter_representation(instance)
         # Dealing with nested relationships, data can be a Manager,
         # so, first get a queryset from the Manager if needed
         iterable = instance.all() if isinstance(instance, models.Manager) else instance
         return [self.child.to_representation(item)['item'] for item in iterable]
 
+    def iter_representation(self, instance):
+        """
+        List of object instances -> generator of dicts of primitive data types.
+        """
+        iterable = instance.all() if isinstance(instance, models.Manager) else instance
+        if isinstance(iterable, models.QuerySet):
+            iterable = iterable.iterator(chunk_size=self.chunk_size)
+        for item in iterable:
+            yield self.child.to_representation(item)['item']
+
 
 # ModelSerializerNode metadata
 _MODEL_SERIALIZER_NODE_NAME = 'model_serializer'
@@ -6,8 +6,10 @@ _NODE_KIND = 'start'
 
 
 class StartNode(Node):
+    __slots__ = ()
     name = _NODE_NAME
     kind = _NODE_KIND
+    blocking = False
 
     def run(self, *args, **kwargs):
         return self.inputs
@@ -1,3 +1,4 @@
 from .app_state import AppState
-from .base import State
+from .base import State, NodeRecord, NodeSummary, RETENTION_FULL, RETENTION_RING, RETENTION_SUMMARY, RETENTION_NONE
 from .flow_state import FlowState
+from .store import LayeredDict
@@ -1,4 +1,20 @@
-import copy
+from collections import deque, namedtuple
+from copy import deepcopy
+
+from .store import LayeredDict
+
+# how much of the node history a state keeps
+RETENTION_FULL = 'full'
+RETENTION_RING = 'ring'
+RETENTION_SUMMARY = 'summary'
+RETENTION_NONE = 'none'
+RETENTIONS = (RETENTION_FULL, RETENTION_RING, RETENTION_SUMMARY, RETENTION_NONE)
+DEFAULT_RING_SIZE = 100
+
+# what the summary retention keeps of a node, duration in seconds
+NodeSummary = namedtuple('NodeSummary', ['id', 'kind', 'duration'])
+# what the ring retention keeps of a node, the node instance is not held
+NodeRecord = namedtuple('NodeRecord', ['id', 'kind', 'cls', 'inputs', 'outputs'])
 
 
 class State:
@@ -9,20 +25,51 @@ class State:
             node.id: node,
             ...,
         }
+
+    retention decides the node history kept by `push`:
+        full: every node object, with its inputs and outputs.
+        ring: a NodeRecord(id, kind, cls, inputs, outputs) of the last `size` nodes.
+        summary: a NodeSummary(id, kind, duration) of every node.
+        none: nothing.
     """
 
-    def __init__(self, init_data=None):
-        self._nodes = []
-        self._data = copy.deepcopy(init_data) if init_data else {}
+    def __init__(self, init_data=None, retention=RETENTION_FULL, size=None):
+        if retention not in RETENTIONS:
+            raise Exception(f'Unknown state retention,Please choose one in {RETENTIONS}')
+        self.retention = retention
+        self.size = size or DEFAULT_RING_SIZE
+        self._nodes = deque(maxlen=self.size) if retention == RETENTION_RING else []
+        self._data = init_data.snapshot() if isinstance(init_data, LayeredDict) else LayeredDict(init_data)
         self._steps = {}
 
+    @property
+    def timed(self):
+        """Whether `push` expects the duration of the node."""
+        return self.retention == RETENTION_SUMMARY
+
+    @property
+    def keeps_nodes(self):
+        """whether the history holds the node instances"""
+        return self.retention == RETENTION_FULL
+
     @property
     def nodes(self):
         """A list of all the nodes that have been run."""
         return self._nodes
 
-    def push(self, node):
+    def push(self, node, duration=None):
         """Press the target node into state nodes."""
+        if self.retention == RETENTION_NONE:
+            return
+        if self.retention == RETENTION_SUMMARY:
+            node = NodeSummary(node.id, node.kind, duration)
+        elif self.retention == RETENTION_RING:
+            node = NodeRecord(node.id, node.kind, node.__class__, node.inputs, node.outputs)
+            if len(self._nodes) == self.size:
+                # the oldest record leaves the ring, and the steps when it is the last one of its id
+                evicted = self._nodes[0]
+                if self._steps.get(evicted.id) is evicted:
+                    del self._steps[evicted.id]
         self._nodes.append(node)
         self._steps[node.id] = node
 
@@ -32,16 +79,51 @@ class State:
             return None
 
         node = self._nodes.pop()
+        if self._steps.get(node.id) is node:
+            # the step of the id goes back to its previous node, if there is one left
+            for previous in reversed(self._nodes):
+                if previous.id == node.id:
+                    self._steps[node.id] = previous
+                    break
+            else:
+                del self._steps[node.id]
         return node
 
     def fetch(self):
-        """fetch state data"""
-        return self._data
+        """fetch state data, a dict, writes to it change the state data"""
+        return self._data.as_dict()
 
     def commit(self, data):
-        """merge state data"""
-        self._data = {**self._data, **data}
+        """merge state data, it costs the number of keys in data"""
+        self._data.update(data)
+
+    def replace(self, data):
+        """replace state data by data, keys missing in data are removed"""
+        self._data = LayeredDict(data)
+
+    def snapshot(self):
+        """A copy of the state data, it shares the unchanged data with the state."""
+        return self._data.snapshot()
+
+    def copy(self, deep=False):
+        """
+        A state with the same data and retention, but no node history.
+        a deep copy shares no nested list or dict with the state, a value which cannot be copied is shared.
+        """
+        data = {key: _deepcopy(value) for key, value in self.fetch().items()} if deep else self.snapshot()
+        return self.__class__(data, retention=self.retention, size=self.size)
 
     @property
     def steps(self):
         return self._steps
+
+
+def _deepcopy(value):
+    """
+    a deep copy of the value, the value itself when it cannot be copied.
+    """
+    try:
+        return deepcopy(value)
+    # pylint:disable=broad-except
+    except Exception:
+        return value
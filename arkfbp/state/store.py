@@ -0,0 +1,123 @@
+"""
+Copy-on-write mapping behind the state data.
+"""
+from collections.abc import MutableMapping
+
+_MISSING = object()
+_DELETED = object()
+
+
+class LayeredDict(MutableMapping):
+    """
+    A mapping made of frozen layers, shared with its snapshots, under a private top layer.
+
+    Writes only touch the top layer, so a commit costs the number of changed keys.
+    `snapshot()` freezes the top layer and returns a new mapping sharing every layer,
+    the layers are merged by size so reads look up a logarithmic number of dicts.
+    `as_dict()` merges the layers into the top one and returns it as a plain dict.
+    """
+    __slots__ = ('_layers', '_top', '_exposed')
+
+    def __init__(self, data=None):
+        self._layers = ()
+        self._top = dict(data) if data else {}
+        # the top layer was handed out by `as_dict`, it is copied when it is frozen
+        self._exposed = False
+
+    def __getitem__(self, key):
+        value = self._top.get(key, _MISSING)
+        if value is _MISSING:
+            for layer in reversed(self._layers):
+                value = layer.get(key, _MISSING)
+                if value is not _MISSING:
+                    break
+        if value is _MISSING or value is _DELETED:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._top[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if self._layers:
+            self._top[key] = _DELETED
+        else:
+            del self._top[key]
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.flatten())
+
+    def __len__(self):
+        return len(self.flatten())
+
+    def __repr__(self):
+        return repr(self.flatten())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, *args, **kwargs):    # pylint: disable=arguments-differ
+        self._top.update(*args, **kwargs)
+
+    def flatten(self):
+        """
+        a plain dict of the mapping.
+        """
+        if not self._layers:
+            return dict(self._top)
+        merged = {}
+        for layer in self._layers:
+            merged.update(layer)
+        merged.update(self._top)
+        return {key: value for key, value in merged.items() if value is not _DELETED}
+
+    def as_dict(self):
+        """
+        the mapping as a plain dict, writes to it change the mapping until the next snapshot.
+        the layers are merged once, the dict is returned again while there is no snapshot.
+        """
+        if self._layers:
+            self._top = self.flatten()
+            self._layers = ()
+        self._exposed = True
+        return self._top
+
+    def snapshot(self):
+        """
+        an independent copy of the mapping, sharing the frozen layers.
+        """
+        self._freeze()
+        snapshot = self.__class__()
+        snapshot._layers = self._layers
+        return snapshot
+
+    copy = snapshot
+
+    def _freeze(self):
+        if not self._top:
+            return
+        layers = list(self._layers)
+        # a dict handed out can still be written, the layer frozen is a copy of it
+        layers.append(dict(self._top) if self._exposed else self._top)
+        self._top = {}
+        self._exposed = False
+        # merge the newest layers while they are of similar size, layers shared
+        # with other snapshots are never modified, a merge builds a new dict.
+        while len(layers) > 1 and len(layers[-2]) <= 2 * len(layers[-1]):
+            newest = layers.pop()
+            layers[-1] = {**layers[-1], **newest}
+        if len(layers) == 1:
+            layers[0] = {key: value for key, value in layers[0].items() if value is not _DELETED}
+        self._layers = tuple(layers)
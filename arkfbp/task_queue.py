@@ -0,0 +1,341 @@
+"""
+Local durable task queue of flows, stored in SQLite.
+
+`Executer.submit_flow` queues a flow, the `runworkers` command runs the queued flows
+in worker processes. Configured by `settings.ARKFBP_TASK_QUEUE`:
+
+    ARKFBP_TASK_QUEUE = {
+        'path': None,                   # SQLite file, `BASE_DIR/arkfbp_tasks.sqlite3` by default
+        'max_retries': 3,               # retries of a failed task, then it is FAILED
+        'visibility_timeout': 300,      # seconds a claimed task is hidden, extended while its worker runs it
+        'retry_delay': 5,               # seconds before the first retry, doubled by every retry
+        'poll_interval': 1,             # seconds an idle worker waits before looking for a task
+    }
+"""
+import importlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+TASK_PENDING = 'PENDING'
+TASK_RUNNING = 'RUNNING'
+TASK_DONE = 'DONE'
+TASK_FAILED = 'FAILED'
+TASK_FINISHED = (TASK_DONE, TASK_FAILED)
+
+DEFAULT_CONFIG = {
+    'path': None,
+    'max_retries': 3,
+    'visibility_timeout': 300,
+    'retry_delay': 5,
+    'poll_interval': 1,
+}
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS tasks ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, flow TEXT NOT NULL, inputs TEXT, '
+    'priority INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+    'max_retries INTEGER NOT NULL, visible_at REAL NOT NULL, worker TEXT, '
+    'result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (status, priority DESC, visible_at, id)',
+)
+
+_LOCK = threading.Lock()
+_QUEUES = {}
+
+
+def get_config():
+    """
+    settings.ARKFBP_TASK_QUEUE over the default config.
+    """
+    config = getattr(settings, 'ARKFBP_TASK_QUEUE', None) if settings.configured else None
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    if not config['path']:
+        base_dir = getattr(settings, 'BASE_DIR', None) if settings.configured else None
+        config['path'] = os.path.join(str(base_dir or os.getcwd()), 'arkfbp_tasks.sqlite3')
+    return config
+
+
+def get_task_queue(path=None):
+    """
+    the task queue of the path, `settings.ARKFBP_TASK_QUEUE` by default.
+    """
+    config = get_config()
+    path = path or config['path']
+    with _LOCK:
+        if path not in _QUEUES:
+            _QUEUES[path] = TaskQueue(path, config['max_retries'], config['visibility_timeout'],
+                                      config['retry_delay'])
+        return _QUEUES[path]
+
+
+def run_flow(flow_path, inputs, run_id=None):
+    """
+    run the `Main` flow of the flow module, an error of the flow is raised.
+    a retried task runs with the same id, a flow with checkpoints resumes where the last attempt stopped.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .executer import Executer
+    from .flow.base import FLOW_ERROR
+    flow = importlib.import_module(f'{flow_path}.main').Main()
+    Executer.start_flow(flow, inputs, run_id=run_id)
+    if flow.valid_status(FLOW_ERROR):
+        raise flow.error
+    return flow.outputs
+
+
+def dumps(outputs):
+    """
+    JSON of the outputs, the repr of outputs JSON can not encode.
+    """
+    try:
+        return json.dumps(outputs, cls=DjangoJSONEncoder)
+    except (TypeError, ValueError):
+        return json.dumps(repr(outputs))
+
+
+class TaskHandle:
+    """
+    A queued flow, to look up its status and result.
+    """
+
+    def __init__(self, task_id, queue):
+        self.id = task_id
+        self.queue = queue
+
+    def __repr__(self):
+        return f'TaskHandle: {self.id}'
+
+    def fetch(self):
+        """
+        the row of the task.
+        """
+        task = self.queue.get(self.id)
+        if task is None:
+            raise Exception(f'Task {self.id} not found')
+        return task
+
+    @property
+    def status(self):
+        """
+        PENDING, RUNNING, DONE or FAILED.
+        """
+        return self.fetch()['status']
+
+    @property
+    def error(self):
+        """
+        traceback of the last failed attempt.
+        """
+        return self.fetch()['error']
+
+    def done(self):
+        """
+        whether the task is DONE or FAILED.
+        """
+        return self.status in TASK_FINISHED
+
+    def result(self, timeout=None, poll_interval=0.5):
+        """
+        the outputs of the flow, waits until the task is finished or the timeout expires.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            task = self.fetch()
+            if task['status'] == TASK_DONE:
+                return json.loads(task['result']) if task['result'] is not None else None
+            if task['status'] == TASK_FAILED:
+                raise Exception(f'Task {self.id} failed:\n{task["error"]}')
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f'Task {self.id} is {task["status"]}')
+            time.sleep(poll_interval)
+
+
+class TaskQueue:
+    """
+    Tasks in a SQLite file, shared by the processes submitting and running them.
+
+    A worker claims a task by hiding it for `visibility_timeout` seconds,
+    a task not completed in time, e.g. its worker died, is claimed again.
+    """
+
+    def __init__(self, path, max_retries=3, visibility_timeout=300, retry_delay=5):
+        self.path = path
+        self.max_retries = max_retries
+        self.visibility_timeout = visibility_timeout
+        self.retry_delay = retry_delay
+        with self.connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            for statement in _SCHEMA:
+                connection.execute(statement)
+
+    def connect(self):
+        """
+        a connection in autocommit mode, transactions are explicit.
+        """
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return _Closing(connection)
+
+    def put(self, flow_path, inputs=None, priority=0, max_retries=None):
+        """
+        queue a flow, tasks of higher priority are claimed first.
+        """
+        now = time.time()
+        max_retries = self.max_retries if max_retries is None else max_retries
+        with self.connect() as connection:
+            cursor = connection.execute(
+                'INSERT INTO tasks (flow, inputs, priority, status, max_retries, visible_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (flow_path, dumps(inputs), priority, TASK_PENDING, max_retries, now, now, now))
+            return TaskHandle(cursor.lastrowid, self)
+
+    def get(self, task_id):
+        """
+        the row of a task as a dict, None when it does not exist.
+        """
+        with self.connect() as connection:
+            row = connection.execute('SELECT * FROM tasks WHERE id = ?', (task_id, )).fetchone()
+        return dict(row) if row else None
+
+    def claim(self, worker):
+        """
+        the next visible task, hidden for `visibility_timeout` seconds, None when there is none.
+        """
+        with self.connect() as connection:
+            while True:
+                now = time.time()
+                connection.execute('BEGIN IMMEDIATE')
+                row = connection.execute(
+                    'SELECT * FROM tasks WHERE status IN (?, ?) AND visible_at <= ? '
+                    'ORDER BY priority DESC, visible_at, id LIMIT 1', (TASK_PENDING, TASK_RUNNING, now)).fetchone()
+                if row is None:
+                    connection.execute('COMMIT')
+                    return None
+                if row['status'] == TASK_RUNNING and row['attempts'] > row['max_retries']:
+                    # the last attempt did not complete in time
+                    connection.execute('UPDATE tasks SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+                                       (TASK_FAILED, 'Visibility timeout expired', now, row['id']))
+                    connection.execute('COMMIT')
+                    continue
+                connection.execute(
+                    'UPDATE tasks SET status = ?, attempts = attempts + 1, visible_at = ?, worker = ?, updated_at = ? '
+                    'WHERE id = ?', (TASK_RUNNING, now + self.visibility_timeout, worker, now, row['id']))
+                connection.execute('COMMIT')
+                task = dict(row)
+                task['attempts'] += 1
+                task['worker'] = worker
+                return task
+
+    @staticmethod
+    def _update_claimed(connection, task, assignments, values):
+        """
+        update the task while the claim of the worker still holds it, whether it did.
+        after the visibility timeout the task may have been claimed by another worker.
+        """
+        cursor = connection.execute(
+            f'UPDATE tasks SET {assignments} WHERE id = ? AND worker = ? AND attempts = ? AND status = ?',
+            (*values, task['id'], task['worker'], task['attempts'], TASK_RUNNING))
+        if cursor.rowcount:
+            return True
+        logger.warning('Task %s is no longer claimed by %s, its update is dropped.', task['id'], task['worker'])
+        return False
+
+    def extend(self, task):
+        """
+        hide a running task for another `visibility_timeout` seconds, whether the worker still holds it.
+        """
+        now = time.time()
+        with self.connect() as connection:
+            return self._update_claimed(connection, task, 'visible_at = ?, updated_at = ?',
+                                        (now + self.visibility_timeout, now))
+
+    def heartbeat(self, task, done):
+        """
+        extend the visibility of a task until the done event is set, long flows are not claimed again.
+        """
+        while not done.wait(self.visibility_timeout / 3):
+            if not self.extend(task):
+                return
+
+    def complete(self, task, outputs):
+        """
+        store the outputs of a task as JSON, whether the worker still held the task.
+        """
+        with self.connect() as connection:
+            return self._update_claimed(connection, task, 'status = ?, result = ?, error = NULL, updated_at = ?',
+                                        (TASK_DONE, dumps(outputs), time.time()))
+
+    def fail(self, task, error):
+        """
+        queue a failed task again after a delay, or mark it FAILED when it has no retry left.
+        whether the worker still held the task.
+        """
+        now = time.time()
+        with self.connect() as connection:
+            if task['attempts'] > task['max_retries']:
+                return self._update_claimed(connection, task, 'status = ?, error = ?, updated_at = ?',
+                                            (TASK_FAILED, error, now))
+            delay = self.retry_delay * 2**(task['attempts'] - 1)
+            return self._update_claimed(connection, task, 'status = ?, error = ?, visible_at = ?, updated_at = ?',
+                                        (TASK_PENDING, error, now + delay, now))
+
+    def run(self, task):
+        """
+        run the flow of a claimed task, its visibility is extended while it runs.
+        """
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.heartbeat, args=(task, done), daemon=True)
+        heartbeat.start()
+        try:
+            outputs = run_flow(task['flow'], json.loads(task['inputs']) if task['inputs'] else None,
+                               run_id=f'task:{task["id"]}')
+        # pylint: disable=broad-except
+        except Exception:
+            self.fail(task, traceback.format_exc())
+            return False
+        finally:
+            done.set()
+            heartbeat.join()
+        return self.complete(task, outputs)
+
+    def work(self, stop, poll_interval=1, burst=False):
+        """
+        claim and run tasks until the stop event is set, or until no task is visible in burst mode.
+        """
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        while not stop.is_set():
+            task = self.claim(worker)
+            if task is None:
+                if burst:
+                    return
+                stop.wait(poll_interval)
+                continue
+            self.run(task)
+
+
+class _Closing:
+    """
+    closes the connection when the block ends, sqlite3 connections only end transactions.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, *exc_info):
+        if self.connection.in_transaction:
+            self.connection.execute('ROLLBACK')
+        self.connection.close()
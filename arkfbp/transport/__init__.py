@@ -0,0 +1,7 @@
+"""
+HTTP transport of the API nodes.
+"""
+from .session import close_sessions, get_config, get_host, get_origin, get_session, get_timeout
+from .http_cache import get_http_cache
+from .proxy import streaming_response
+from .single_flight import SINGLE_FLIGHT
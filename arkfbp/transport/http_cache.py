@@ -0,0 +1,532 @@
+"""
+Cache of upstream GET responses by their HTTP headers.
+
+A response is fresh for the `max-age` (or `s-maxage`) of its `Cache-Control`, else until its `Expires`.
+A stale response with an `ETag` or a `Last-Modified` is revalidated by a conditional request,
+a `304 Not Modified` refreshes it without downloading the body again. `no-store`, `private`, `Vary: *` and
+responses without freshness nor validators are not cached, nor the responses to a request with credentials
+(`auth`, or one of the `key_headers`) unless they are `public` or have a `s-maxage`. Within its
+`stale-while-revalidate` window a stale response is returned at once and revalidated in the background.
+
+A response is cached by the url, the query, the auth, the session profile and the `key_headers` of the request,
+then by the request headers named by its `Vary`.
+
+Configured by `settings.ARKFBP_HTTP_CACHE`:
+
+    ARKFBP_HTTP_CACHE = {
+        'max_bytes': 64 * 1024 * 1024,      # bytes of bodies kept in memory, least recently used are evicted
+        'store': None,                      # 'sqlite' shares the responses between the workers in a SQLite file
+        'path': None,                       # `BASE_DIR/arkfbp_http_cache.sqlite3` by default
+        'max_disk_bytes': 512 * 1024 * 1024,
+        'stale_while_revalidate': 0,        # seconds, used when the response does not define it
+        'key_headers': ('Authorization', 'Proxy-Authorization', 'Cookie'),    # request headers of the key
+    }
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from requests.structures import CaseInsensitiveDict
+
+from .session import get_host
+
+STORE_SQLITE = 'sqlite'
+
+DEFAULT_CONFIG = {
+    'max_bytes': 64 * 1024 * 1024,
+    'store': None,
+    'path': None,
+    'max_disk_bytes': 512 * 1024 * 1024,
+    'stale_while_revalidate': 0,
+    'key_headers': ('Authorization', 'Proxy-Authorization', 'Cookie'),
+}
+
+# statuses cached when their headers allow it
+CACHEABLE_STATUSES = (200, 203, 300, 301, 308, 404, 410)
+
+HIT = 'hits'
+STALE = 'stale'
+REVALIDATED = 'revalidated'
+MISS = 'misses'
+
+_LOCK = threading.Lock()
+_CACHE = None
+
+
+def get_config():
+    """
+    settings.ARKFBP_HTTP_CACHE over the default config.
+    """
+    config = getattr(settings, 'ARKFBP_HTTP_CACHE', None) if settings.configured else None
+    return {**DEFAULT_CONFIG, **(config or {})}
+
+
+def parse_cache_control(value):
+    """
+    directives of a `Cache-Control` header, {name: value or None}.
+    """
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _seconds(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _timestamp(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CachedResponse:
+    """
+    A cached response, it has the `status_code`, `headers` and `content` of a `requests` response.
+    """
+    __slots__ = ('status_code', 'headers', 'content', 'vary', 'expires_at', 'stale_while_revalidate')
+
+    def __init__(self, status_code, headers, content, vary=None):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        # values of the request headers named by `Vary`
+        self.vary = vary or {}
+        self.expires_at = None
+        self.stale_while_revalidate = 0
+
+    @property
+    def size(self):
+        """
+        bytes of the body.
+        """
+        return len(self.content)
+
+    @property
+    def validators(self):
+        """
+        headers of a conditional request revalidating the response.
+        """
+        headers = {}
+        if 'ETag' in self.headers:
+            headers['If-None-Match'] = self.headers['ETag']
+        if 'Last-Modified' in self.headers:
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+    def refresh(self, now, default_stale_while_revalidate=0, authorized=False):
+        """
+        compute the freshness from the headers, False when the response must not be cached.
+        the response of a request with credentials is only cached when it is explicitly shared.
+        """
+        directives = parse_cache_control(self.headers.get('Cache-Control'))
+        if 'no-store' in directives or 'private' in directives or self.headers.get('Vary', '').strip() == '*':
+            return False
+        if authorized and 'public' not in directives and 's-maxage' not in directives:
+            return False
+        if 'no-cache' in directives:
+            lifetime = 0
+        elif _seconds(directives.get('s-maxage')) is not None:
+            lifetime = _seconds(directives['s-maxage'])
+        elif _seconds(directives.get('max-age')) is not None:
+            lifetime = _seconds(directives['max-age'])
+        elif 'Expires' in self.headers:
+            expires = _timestamp(self.headers['Expires'])
+            date = _timestamp(self.headers.get('Date')) or now
+            lifetime = max(expires - date, 0) if expires is not None else 0
+        else:
+            lifetime = 0
+        if not lifetime and not self.validators:
+            return False
+        self.expires_at = now + lifetime - (_seconds(self.headers.get('Age')) or 0)
+        swr = _seconds(directives.get('stale-while-revalidate'))
+        self.stale_while_revalidate = default_stale_while_revalidate if swr is None else swr
+        return True
+
+    def fresh(self, now):
+        """
+        whether the response can be used without revalidation.
+        """
+        return now < self.expires_at
+
+    def usable_stale(self, now):
+        """
+        whether the stale response can be returned while it is revalidated.
+        """
+        return now < self.expires_at + self.stale_while_revalidate
+
+    def matches(self, request_headers):
+        """
+        whether the request has the header values the response varies by.
+        """
+        request_headers = CaseInsensitiveDict(request_headers or {})
+        return all(request_headers.get(name) == value for name, value in self.vary.items())
+
+
+class VaryIndex:
+    """
+    Names of the request headers the responses of a key vary by, the responses are cached by their values.
+    """
+    __slots__ = ('names', )
+    size = 0
+
+    def __init__(self, names):
+        self.names = names
+
+
+def vary_key(key, vary):
+    """
+    key of a response varying by the request header values, {lowercase name: value}.
+    """
+    if not vary:
+        return key
+    return hashlib.sha1(repr((key, sorted(vary.items()))).encode()).hexdigest()
+
+
+class MemoryStore:
+    """
+    In-process LRU of responses, bounded by the bytes of their bodies.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        cached response of the key, None on a miss.
+        """
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+            return response
+
+    def set(self, key, response):
+        """
+        cache the response of the key.
+        """
+        if response.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._responses.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._responses[key] = response
+            self.bytes += response.size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._responses.popitem(last=False)
+                self.bytes -= evicted.size
+
+    def delete(self, key):
+        """
+        remove the cached response of the key.
+        """
+        with self._lock:
+            response = self._responses.pop(key, None)
+            if response is not None:
+                self.bytes -= response.size
+
+    def clear(self):
+        """
+        remove all the cached responses.
+        """
+        with self._lock:
+            self._responses.clear()
+            self.bytes = 0
+
+
+class SQLiteStore:
+    """
+    Responses in a SQLite file shared by the workers, the least recently used are removed over `max_bytes`.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        with self.connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, payload BLOB NOT NULL, '
+                               'size INTEGER NOT NULL, used_at REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)')
+
+    def connect(self):
+        """
+        a connection committing when the block ends.
+        """
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        """
+        cached response of the key, None on a miss.
+        """
+        with self.connect() as connection:
+            row = connection.execute('SELECT payload FROM responses WHERE key = ?', (key, )).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE responses SET used_at = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def set(self, key, response):
+        """
+        cache the response of the key.
+        """
+        payload = pickle.dumps(response, pickle.HIGHEST_PROTOCOL)
+        with self.connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO responses (key, payload, size, used_at) VALUES (?, ?, ?, ?)',
+                               (key, payload, len(payload), time.time()))
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            for old_key, size in connection.execute('SELECT key, size FROM responses ORDER BY used_at').fetchall():
+                if total <= self.max_bytes:
+                    break
+                connection.execute('DELETE FROM responses WHERE key = ?', (old_key, ))
+                total -= size
+
+    def delete(self, key):
+        """
+        remove the cached response of the key.
+        """
+        with self.connect() as connection:
+            connection.execute('DELETE FROM responses WHERE key = ?', (key, ))
+
+    def clear(self):
+        """
+        remove all the cached responses.
+        """
+        with self.connect() as connection:
+            connection.execute('DELETE FROM responses')
+
+
+class HTTPCacheStats:
+    """
+    Hit, stale, revalidated and miss counters by host.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: dict.fromkeys((HIT, STALE, REVALIDATED, MISS), 0))
+
+    def record(self, host, outcome):
+        """
+        count a lookup.
+        """
+        with self._lock:
+            self._counters[host][outcome] += 1
+
+    def snapshot(self):
+        """
+        counters of every host.
+        """
+        with self._lock:
+            return {host: dict(counters) for host, counters in self._counters.items()}
+
+    def reset(self):
+        """
+        drop all the counters.
+        """
+        with self._lock:
+            self._counters.clear()
+
+
+stats = HTTPCacheStats()
+
+
+class HTTPCache:
+    """
+    GET responses cached in memory, and in a shared store when there is one.
+    """
+
+    def __init__(self, max_bytes, shared=None, stale_while_revalidate=0, key_headers=DEFAULT_CONFIG['key_headers']):
+        self.memory = MemoryStore(max_bytes)
+        self.shared = shared
+        self.stale_while_revalidate = stale_while_revalidate
+        self.key_headers = tuple(key_headers)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def make_key(self, url, request_kwargs, profile=None):
+        """
+        key of a GET, by the url, the query, the auth, the session profile and the `key_headers`.
+        """
+        params = request_kwargs.get('params')
+        params = sorted(params.items()) if isinstance(params, dict) else params
+        headers = CaseInsensitiveDict(request_kwargs.get('headers') or {})
+        credentials = [(name.lower(), headers.get(name)) for name in self.key_headers]
+        identity = repr((url, params, request_kwargs.get('auth'), profile, credentials))
+        return hashlib.sha1(identity.encode()).hexdigest()
+
+    def authorized(self, request_kwargs):
+        """
+        whether the request carries credentials.
+        """
+        headers = CaseInsensitiveDict(request_kwargs.get('headers') or {})
+        return request_kwargs.get('auth') is not None or any(name in headers for name in self.key_headers)
+
+    def lookup(self, key, request_headers):
+        """
+        cached response of the key for the request headers, None on a miss.
+        """
+        entry = self.get(key)
+        if isinstance(entry, VaryIndex):
+            request_headers = CaseInsensitiveDict(request_headers or {})
+            entry = self.get(vary_key(key, {name: request_headers.get(name) for name in entry.names}))
+        return entry
+
+    def save(self, key, response):
+        """
+        cache the response of the key, under the values of the request headers it varies by.
+        """
+        if response.vary:
+            self.set(key, VaryIndex(tuple(sorted(response.vary))))
+        self.set(vary_key(key, response.vary), response)
+
+    def get(self, key):
+        """
+        cached response of the key, None on a miss.
+        """
+        response = self.memory.get(key)
+        if response is None and self.shared is not None:
+            response = self.shared.get(key)
+            if response is not None:
+                self.memory.set(key, response)
+        return response
+
+    def set(self, key, response):
+        """
+        cache the response of the key.
+        """
+        self.memory.set(key, response)
+        if self.shared is not None:
+            self.shared.set(key, response)
+
+    def delete(self, key):
+        """
+        remove the cached response of the key.
+        """
+        self.memory.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        """
+        remove all the cached responses.
+        """
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def request(self, session, url, request_kwargs, stale_while_revalidate=None, profile=None):
+        """
+        GET the url by the session of the profile, returns the cached response when it is fresh.
+        """
+        host = get_host(url)
+        key = self.make_key(url, request_kwargs, profile)
+        now = time.time()
+        cached = self.lookup(key, request_kwargs.get('headers'))
+        if cached is not None and not cached.matches(request_kwargs.get('headers')):
+            cached = None
+        if cached is not None:
+            if cached.fresh(now):
+                stats.record(host, HIT)
+                return cached
+            if cached.usable_stale(now):
+                stats.record(host, STALE)
+                self.revalidate_later(session, url, request_kwargs, key, cached, stale_while_revalidate)
+                return cached
+        return self.fetch(session, url, request_kwargs, key, cached, stale_while_revalidate, host)
+
+    def fetch(self, session, url, request_kwargs, key, cached, stale_while_revalidate, host):
+        """
+        send the GET, conditional when there is a stale response, and cache the response.
+        """
+        kwargs = dict(request_kwargs)
+        if cached is not None:
+            kwargs['headers'] = {**(request_kwargs.get('headers') or {}), **cached.validators}
+        response = session.get(url, **kwargs)
+        now = time.time()
+        default_swr = self.stale_while_revalidate if stale_while_revalidate is None else stale_while_revalidate
+        authorized = self.authorized(request_kwargs)
+
+        if cached is not None and response.status_code == 304:
+            stats.record(host, REVALIDATED)
+            # the cached response may be read by other threads, it is replaced instead of updated
+            cached = CachedResponse(cached.status_code, {**cached.headers, **response.headers}, cached.content,
+                                    cached.vary)
+            if cached.refresh(now, default_swr, authorized):
+                self.save(key, cached)
+            else:
+                self.delete(vary_key(key, cached.vary))
+            return cached
+
+        stats.record(host, MISS)
+        if response.status_code in CACHEABLE_STATUSES:
+            request_headers = CaseInsensitiveDict(request_kwargs.get('headers') or {})
+            vary = {
+                name.strip().lower(): request_headers.get(name.strip())
+                for name in response.headers.get('Vary', '').split(',') if name.strip()
+            }
+            entry = CachedResponse(response.status_code, response.headers, response.content, vary)
+            if entry.refresh(now, default_swr, authorized):
+                self.save(key, entry)
+            elif cached is not None:
+                self.delete(vary_key(key, cached.vary))
+        return response
+
+    def revalidate_later(self, session, url, request_kwargs, key, cached, stale_while_revalidate):
+        """
+        revalidate a stale response in the background, once at a time per key.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='arkfbp-http-cache')
+
+        def revalidate():
+            try:
+                self.fetch(session, url, request_kwargs, key, cached, stale_while_revalidate, get_host(url))
+            except Exception:    # pylint: disable=broad-except
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._pool.submit(revalidate)
+
+
+def get_http_cache():
+    """
+    the process wide cache of `settings.ARKFBP_HTTP_CACHE`, created on first use.
+    """
+    global _CACHE    # pylint: disable=global-statement
+    if _CACHE is None:
+        with _LOCK:
+            if _CACHE is None:
+                config = get_config()
+                shared = None
+                if config['store'] == STORE_SQLITE:
+                    base_dir = str(getattr(settings, 'BASE_DIR', None) or os.getcwd()) if settings.configured \
+                        else os.getcwd()
+                    shared = SQLiteStore(config['path'] or os.path.join(base_dir, 'arkfbp_http_cache.sqlite3'),
+                                         config['max_disk_bytes'])
+                _CACHE = HTTPCache(config['max_bytes'], shared, config['stale_while_revalidate'],
+                                   config['key_headers'])
+    return _CACHE
@@ -0,0 +1,110 @@
+"""
+Relay of a django request to an upstream, and of its response back, without buffering the bodies.
+"""
+from django.http import StreamingHttpResponse
+
+# headers of a single connection, they are never forwarded
+HOP_BY_HOP_HEADERS = frozenset(('connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te',
+                                'trailer', 'trailers', 'transfer-encoding', 'upgrade', 'host'))
+# bytes read from the request and from the upstream at a time
+CHUNK_SIZE = 64 * 1024
+
+
+def _connection_headers(value):
+    return {name.strip().lower() for name in (value or '').split(',') if name.strip()}
+
+
+def request_headers(request):
+    """
+    end to end headers of a django request, with the `X-Forwarded-*` headers of the proxy.
+    """
+    headers = {}
+    for key, value in request.META.items():
+        if key.startswith('HTTP_'):
+            headers[key[5:].replace('_', '-').title()] = value
+        elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH') and value:
+            headers[key.replace('_', '-').title()] = value
+    dropped = HOP_BY_HOP_HEADERS | _connection_headers(headers.get('Connection'))
+    headers = {name: value for name, value in headers.items() if name.lower() not in dropped}
+
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    remote_addr = request.META.get('REMOTE_ADDR')
+    if remote_addr:
+        headers['X-Forwarded-For'] = f'{forwarded_for}, {remote_addr}' if forwarded_for else remote_addr
+    headers['X-Forwarded-Host'] = request.get_host()
+    headers['X-Forwarded-Proto'] = request.scheme
+    return headers
+
+
+class RequestBody:
+    """
+    The body of a django request read in chunks, its length lets `requests` send a `Content-Length`
+    instead of a chunked body.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.length = int(request.META.get('CONTENT_LENGTH') or 0)
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=CHUNK_SIZE):
+        return self.request.read(size)
+
+
+def request_body(request):
+    """
+    the body to forward, None when the request has none.
+    """
+    if int(request.META.get('CONTENT_LENGTH') or 0) > 0:
+        return RequestBody(request)
+    if request.META.get('HTTP_TRANSFER_ENCODING', '').lower() == 'chunked':
+        return iter(lambda: request.read(CHUNK_SIZE), b'')
+    return None
+
+
+def relay(upstream, chunk_size=CHUNK_SIZE):
+    """
+    the raw bytes of the upstream body, still encoded. the upstream is closed when the relay ends.
+    """
+    try:
+        yield from upstream.raw.stream(chunk_size, decode_content=False)
+    finally:
+        upstream.close()
+
+
+class ProxyResponse(StreamingHttpResponse):
+    """
+    A streaming response of an upstream, the upstream is closed with the response,
+    whether its body was sent or not.
+    """
+
+    def __init__(self, upstream, chunk_size=CHUNK_SIZE):
+        super().__init__(relay(upstream, chunk_size), status=upstream.status_code)
+        self.upstream = upstream
+
+    def close(self):
+        try:
+            self.upstream.close()
+        finally:
+            super().close()
+
+
+def streaming_response(upstream, chunk_size=CHUNK_SIZE):
+    """
+    a django response streaming the status, the end to end headers and the raw body of the upstream.
+    the upstream is closed when the response can not be built.
+    """
+    try:
+        response = ProxyResponse(upstream, chunk_size)
+        # the content type of django is replaced by the one of the upstream, when it has one
+        del response['Content-Type']
+        dropped = HOP_BY_HOP_HEADERS | _connection_headers(upstream.headers.get('Connection'))
+        for name, value in upstream.headers.items():
+            if name.lower() not in dropped:
+                response[name] = value
+    except BaseException:
+        upstream.close()
+        raise
+    return response
@@ -0,0 +1,166 @@
+"""
+Process wide registry of pooled, keep-alive HTTP sessions.
+
+A session is kept per (scheme, host, port) and profile, its connections are reused by every call
+to the same service. Configured by `settings.ARKFBP_HTTP`, a profile overrides the default config:
+
+    ARKFBP_HTTP = {
+        'pool_connections': 10,     # hosts whose pools are kept by a session
+        'pool_maxsize': 10,         # connections kept per host
+        'pool_block': False,        # wait for a free connection instead of opening a new one
+        'keep_alive': True,         # False sends `Connection: close`
+        'retries': 2,               # retries of connection errors and `status_forcelist` responses, see `DeadlineRetry`
+        'backoff_factor': 0.2,      # seconds before the second retry, doubled by every retry
+        'status_forcelist': (502, 503, 504),
+        'allowed_methods': ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'),    # methods which are retried
+        'timeout': None,            # seconds, used when the node has no timeout
+        'auth': None,               # auth of the requests, a (user, password) tuple or a requests auth
+        'headers': None,            # headers of the requests
+        'profiles': {},             # name -> config over the default, `APINode.session_profile`
+    }
+"""
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .. import deadline as flow_deadline
+
+DEFAULT_CONFIG = {
+    'pool_connections': 10,
+    'pool_maxsize': 10,
+    'pool_block': False,
+    'keep_alive': True,
+    'retries': 2,
+    'backoff_factor': 0.2,
+    'status_forcelist': (502, 503, 504),
+    'allowed_methods': ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'),
+    'timeout': None,
+    'auth': None,
+    'headers': None,
+    'profiles': {},
+}
+
+_LOCK = threading.Lock()
+_SESSIONS = {}
+
+
+def get_config(profile=None):
+    """
+    settings.ARKFBP_HTTP over the default config, then the profile over it.
+    """
+    config = getattr(settings, 'ARKFBP_HTTP', None) if settings.configured else None
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    if profile is not None:
+        if profile not in config['profiles']:
+            raise Exception(f'Unknown http session profile {profile}, Please define it in ARKFBP_HTTP profiles')
+        config.update(config['profiles'][profile])
+    return config
+
+
+def get_origin(url):
+    """
+    (scheme, host, port) of the url.
+    """
+    parts = urlsplit(url)
+    return parts.scheme.lower(), (parts.hostname or '').lower(), parts.port
+
+
+def get_host(url):
+    """
+    scheme://host:port of the url, the metrics of the transport are counted by it.
+    """
+    scheme, host, port = get_origin(url)
+    return f'{scheme}://{host}:{port}'
+
+
+class DeadlineRetry(Retry):
+    """
+    Retry policy bounded by the deadline of the flow running in the context, see `arkfbp.deadline`.
+    every attempt is given the time left, so a read error is not retried under a deadline,
+    nor is an error whose backoff does not end before the deadline. `Retry-After` is not waited for.
+    """
+    # pylint: disable=too-many-arguments
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = self
+        if error is not None and flow_deadline.current() is not None and self._is_read_error(error):
+            retry = self.new(read=0)
+        return super(DeadlineRetry, retry).increment(method, url, response, error, _pool, _stacktrace)
+
+    def is_exhausted(self):
+        remaining = flow_deadline.remaining(flow_deadline.current())
+        if remaining is not None and remaining <= self.get_backoff_time():
+            return True
+        return super().is_exhausted()
+
+
+def create_session(config):
+    """
+    a session with pooled connections and the retry policy of the config.
+    """
+    session = requests.Session()
+    # the session is shared by the calls of every request and user, no cookie of an upstream is kept
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    retry = DeadlineRetry(total=config['retries'],
+                          connect=config['retries'],
+                          read=config['retries'],
+                          backoff_factor=config['backoff_factor'],
+                          status_forcelist=config['status_forcelist'],
+                          allowed_methods=frozenset(config['allowed_methods']),
+                          respect_retry_after_header=False,
+                          raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=config['pool_connections'],
+                          pool_maxsize=config['pool_maxsize'],
+                          pool_block=config['pool_block'],
+                          max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if config['auth'] is not None:
+        session.auth = tuple(config['auth']) if isinstance(config['auth'], list) else config['auth']
+    if config['headers']:
+        session.headers.update(config['headers'])
+    if not config['keep_alive']:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def get_session(url, profile=None):
+    """
+    the shared session of the origin of the url under the profile, created on first use.
+    """
+    key = (get_origin(url), profile)
+    session = _SESSIONS.get(key)
+    if session is None:
+        with _LOCK:
+            session = _SESSIONS.get(key)
+            if session is None:
+                session = _SESSIONS[key] = create_session(get_config(profile))
+    return session
+
+
+def get_timeout(profile=None):
+    """
+    the timeout of the profile, None when it has none.
+    """
+    return get_config(profile)['timeout']
+
+
+def close_sessions():
+    """
+    close every session and their connections, new sessions are created by the next calls.
+    """
+    with _LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+    for session in sessions:
+        session.close()
+
+
+# connections of the parent process must not be shared by a forked worker
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_SESSIONS.clear)
@@ -0,0 +1,117 @@
+"""
+Coalescing of identical concurrent calls.
+
+While a call is in flight, the threads making the same call wait for it and share its result
+(or its exception) instead of sending their own. The result is shared, it must not be modified.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+
+from requests.exceptions import Timeout
+
+LEADERS = 'leaders'
+COALESCED = 'coalesced'
+
+
+def make_key(method, url, request_kwargs, profile=None):
+    """
+    key of a call, by the method, the url, the params, the body, the headers, the auth and the session profile.
+    """
+    identity = [method, url]
+    for name in ('params', 'json', 'data', 'headers'):
+        value = request_kwargs.get(name)
+        identity.append(sorted(value.items()) if isinstance(value, dict) else value)
+    identity.append(request_kwargs.get('auth'))
+    identity.append(profile)
+    return hashlib.sha1(repr(identity).encode()).hexdigest()
+
+
+class _Call:
+    """
+    A call in flight.
+    """
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlightStats:
+    """
+    Calls sent and calls coalesced, by host.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: dict.fromkeys((LEADERS, COALESCED), 0))
+
+    def record(self, host, outcome):
+        """
+        count a call.
+        """
+        with self._lock:
+            self._counters[host][outcome] += 1
+
+    def snapshot(self):
+        """
+        counters of every host.
+        """
+        with self._lock:
+            return {host: dict(counters) for host, counters in self._counters.items()}
+
+    def reset(self):
+        """
+        drop all the counters.
+        """
+        with self._lock:
+            self._counters.clear()
+
+
+stats = SingleFlightStats()
+
+
+class SingleFlight:
+    """
+    The calls in flight of the process, by key.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, host='', timeout=None):
+        """
+        the result of `func()`, or of the call of the same key already in flight.
+        a waiting call raises `requests.exceptions.Timeout` when the call in flight did not end within the timeout.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            stats.record(host, COALESCED)
+            if not call.done.wait(timeout):
+                raise Timeout(f'The coalesced call to {host} did not end within {timeout} seconds')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        stats.record(host, LEADERS)
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as exception:
+            call.error = exception
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+SINGLE_FLIGHT = SingleFlight()
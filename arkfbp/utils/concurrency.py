@@ -0,0 +1,71 @@
+"""
+Shared executors for running nodes concurrently.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+_LOCAL = threading.local()
+_LOCK = threading.Lock()
+_THREAD_POOL = None
+_PROCESS_POOL = None
+
+
+def _mark_worker():
+    _LOCAL.worker = True
+
+
+def _init_process():
+    """
+    a forked worker must not use the database connections inherited from the parent, they are opened again on use.
+    """
+    if settings.configured:
+        connections.close_all()
+
+
+def in_worker_thread():
+    """
+    whether the current thread belongs to the shared thread pool.
+    """
+    return getattr(_LOCAL, 'worker', False)
+
+
+def get_thread_pool():
+    """
+    the process wide thread pool, sized by `settings.ARKFBP_THREAD_POOL_SIZE`.
+    """
+    global _THREAD_POOL    # pylint: disable=global-statement
+    if _THREAD_POOL is None:
+        with _LOCK:
+            if _THREAD_POOL is None:
+                max_workers = getattr(settings, 'ARKFBP_THREAD_POOL_SIZE', None) if settings.configured else None
+                _THREAD_POOL = ThreadPoolExecutor(max_workers=max_workers,
+                                                  thread_name_prefix='arkfbp',
+                                                  initializer=_mark_worker)
+    return _THREAD_POOL
+
+
+def get_process_pool():
+    """
+    the process pool for cpu bound nodes, sized by `settings.ARKFBP_PROCESS_POOL_SIZE`.
+    """
+    global _PROCESS_POOL    # pylint: disable=global-statement
+    if _PROCESS_POOL is None:
+        with _LOCK:
+            if _PROCESS_POOL is None:
+                max_workers = getattr(settings, 'ARKFBP_PROCESS_POOL_SIZE', None) if settings.configured else None
+                _PROCESS_POOL = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_process)
+    return _PROCESS_POOL
+
+
+def reset_process_pool(pool):
+    """
+    drop a broken process pool, the next call of `get_process_pool` creates a new one.
+    """
+    global _PROCESS_POOL    # pylint: disable=global-statement
+    with _LOCK:
+        if _PROCESS_POOL is pool:
+            _PROCESS_POOL = None
+    pool.shutdown(wait=False)
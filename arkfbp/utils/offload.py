@@ -0,0 +1,113 @@
+"""
+Run the `run` of cpu bound nodes in the shared process pool.
+"""
+import logging
+import pickle
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .concurrency import get_process_pool, reset_process_pool
+
+logger = logging.getLogger(__name__)
+
+# node attributes which are bound to the flow and never shipped
+_FLOW_ATTRS = ('_flow', '_state', 'flows', '__dict__', '__weakref__')
+
+
+def _node_attrs(node):
+    """
+    the attributes of a node shipped to the worker, from its slots and its `__dict__`.
+    """
+    attrs = dict(getattr(node, '__dict__', {}))
+    for cls in node.__class__.__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        for name in (slots, ) if isinstance(slots, str) else slots:
+            if name not in _FLOW_ATTRS and hasattr(node, name):
+                attrs.setdefault(name, getattr(node, name))
+    return attrs
+
+
+def _unpicklable_parts(parts):
+    """
+    names of the payload parts which can not be pickled.
+    """
+    names = []
+    for name, value in parts.items():
+        try:
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        # pylint: disable=broad-except
+        except Exception as exception:
+            names.append(f'{name} ({exception.__class__.__name__}: {exception})')
+    return names
+
+
+def _run_detached(payload):
+    """
+    entry of the worker process.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ..flow.detached_flow import DetachedFlow
+    node_cls, attrs, state_data, deadline, args, kwargs = pickle.loads(payload)
+    # time.monotonic() is the same clock in every process of the machine
+    flow = DetachedFlow(state_data, deadline)
+    node = node_cls.__new__(node_cls)
+    for name, value in attrs.items():
+        setattr(node, name, value)
+    node.flow = flow
+    node.state = flow.state
+    outputs = node.run(*args, **kwargs)
+    return outputs, dict(flow.state.fetch()), flow.shutdown_args
+
+
+def offload_enabled():
+    """
+    `settings.ARKFBP_PROCESS_POOL = False` runs cpu bound nodes in process.
+    """
+    return getattr(settings, 'ARKFBP_PROCESS_POOL', True) if settings.configured else True
+
+
+def run_in_process(node, *args, **kwargs):
+    """
+    Run `node.run` in the process pool with a snapshot of its inputs and the flow state,
+    then apply the state and shutdown of the worker to the flow.
+    It falls back to run in this process when the node can not be shipped or the pool is broken.
+    """
+    if not offload_enabled():
+        return node.run(*args, **kwargs)
+
+    attrs = _node_attrs(node)
+    state_data = dict(node.state.fetch())
+    try:
+        payload = pickle.dumps((node.__class__, attrs, state_data, node.flow.deadline, args, kwargs),
+                               pickle.HIGHEST_PROTOCOL)
+    # pylint: disable=broad-except
+    except Exception:
+        parts = {'node class': node.__class__, 'state': state_data, 'args': args, 'kwargs': kwargs}
+        parts.update({f'attribute {key}': value for key, value in attrs.items()})
+        logger.warning('Node %s can not be pickled, it runs in process. Unpicklable: %s', node.id,
+                       ', '.join(_unpicklable_parts(parts)))
+        return node.run(*args, **kwargs)
+
+    pool = get_process_pool()
+    try:
+        future = pool.submit(_run_detached, payload)
+    except (BrokenProcessPool, RuntimeError) as exception:
+        logger.warning('Process pool is unavailable (%s), node %s runs in process.', exception, node.id)
+        reset_process_pool(pool)
+        return node.run(*args, **kwargs)
+
+    try:
+        outputs, state_data, shutdown_args = future.result()
+    except BrokenProcessPool as exception:
+        # the worker died before the node finished, the flow state is still untouched
+        logger.warning('Process pool is broken (%s), node %s runs in process.', exception, node.id)
+        reset_process_pool(pool)
+        return node.run(*args, **kwargs)
+
+    # the worker ran on a copy of the whole state, keys it removed are removed here too
+    node.state.replace(state_data)
+    if shutdown_args is not None:
+        outputs, shutdown_kwargs = shutdown_args
+        return node.flow.shutdown(outputs, **shutdown_kwargs)
+    return outputs
@@ -0,0 +1,108 @@
+"""
+Streamed http responses of lazy outputs.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+STREAM_NDJSON = 'ndjson'
+STREAM_CSV = 'csv'
+STREAM_JSON = 'json'
+CONTENT_TYPES = {
+    STREAM_NDJSON: 'application/x-ndjson',
+    STREAM_CSV: 'text/csv',
+    STREAM_JSON: 'application/json',
+}
+# rows are gathered into chunks of about this many characters before they are sent
+CHUNK_SIZE = 64 * 1024
+
+
+class _Echo:
+    """
+    file-like object returning what is written, for `csv.writer`.
+    """
+
+    @staticmethod
+    def write(value):
+        return value
+
+
+def ndjson_rows(items, encoder=DjangoJSONEncoder):
+    """
+    a JSON document per line.
+    """
+    for item in items:
+        yield json.dumps(item, cls=encoder) + '\n'
+
+
+def json_rows(items, encoder=DjangoJSONEncoder):
+    """
+    a JSON array, written item by item.
+    """
+    yield '['
+    separator = ''
+    for item in items:
+        yield separator + json.dumps(item, cls=encoder)
+        separator = ','
+    yield ']'
+
+
+def csv_rows(items):
+    """
+    CSV rows, a header is written from the keys of the first item when it is a dict.
+    under a header a dict is written in the order of the header and a sequence as it is,
+    without a header every item must be a sequence.
+    """
+    writer = csv.writer(_Echo())
+    fieldnames = None
+    for index, item in enumerate(items):
+        if isinstance(item, dict):
+            if index == 0:
+                fieldnames = list(item)
+                yield writer.writerow(fieldnames)
+            elif fieldnames is None:
+                raise Exception(f'CSV row {index} is a dict, but the first row has no header')
+            extra = [key for key in item if key not in fieldnames]
+            if extra:
+                raise Exception(f'CSV row {index} has fields missing in the header: {extra}')
+            item = [item.get(name, '') for name in fieldnames]
+        elif isinstance(item, (str, bytes)) or not isinstance(item, (list, tuple)):
+            raise Exception(f'CSV row {index} must be a dict, a list or a tuple, not {type(item).__name__}')
+        yield writer.writerow(item)
+
+
+ROWS = {
+    STREAM_NDJSON: ndjson_rows,
+    STREAM_CSV: csv_rows,
+    STREAM_JSON: json_rows,
+}
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    """
+    join small rows into chunks, so the server is not called for every row.
+    """
+    chunk = []
+    length = 0
+    for row in rows:
+        chunk.append(row)
+        length += len(row)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_response(items, stream_format=STREAM_NDJSON, status=200):
+    """
+    a StreamingHttpResponse encoding the items while the server sends them.
+    """
+    if stream_format not in ROWS:
+        raise Exception(f'Unknown stream format,Please choose one in {tuple(ROWS)}')
+    return StreamingHttpResponse(chunked(ROWS[stream_format](items)),
+                                 content_type=CONTENT_TYPES[stream_format],
+                                 status=status)
@@ -31,3 +31,10 @@ def get_class_from_path(path):
     module = import_module('.'.join(path_list[:-1]))
     cls = getattr(module, path_list[-1])
     return cls
+
+
+def overridden_methods(cls, base, names):
+    """
+    names of the methods which `cls` overrides from `base`, in the given order.
+    """
+    return tuple(name for name in names if getattr(cls, name, None) is not getattr(base, name, None))